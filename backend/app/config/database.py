@@ -1,4 +1,6 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from backend.app.settings import GLOBAL_SETTINGS
 import logging
 
@@ -6,9 +8,22 @@ sql_logger = logging.getLogger("sqlalchemy.engine")
 sql_logger.setLevel(logging.WARNING)
 
 DATABASE_URL = GLOBAL_SETTINGS.get_database_url()
+ASYNC_DATABASE_URL = GLOBAL_SETTINGS.get_async_database_url()
 
 engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+    pool_size=GLOBAL_SETTINGS.DATABASE_POOL_SIZE,
+    max_overflow=GLOBAL_SETTINGS.DATABASE_MAX_OVERFLOW,
+)
+
+async_session_factory = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 
 def get_db():
     """
@@ -27,3 +42,22 @@ def get_db():
         except Exception as e:
             session.rollback()
             raise e
+
+
+async def get_async_db():
+    """
+    Provides an asynchronous database session backed by asyncpg.
+    Session is automatically closed after use.
+
+    Yields:
+        AsyncSession: SQLModel async session instance
+
+    Raises:
+        Exception: If there's an error during database operations
+    """
+    async with async_session_factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            raise e
@@ -1,25 +1,85 @@
+import asyncio
 from fastapi import FastAPI
 from typing import AsyncIterator
 
 from backend.app.routes.spotify import spotify_router
+from backend.app.routes.now_playing import now_playing_router
 from backend.app.routes.users import users_router
 
 from contextlib import asynccontextmanager
+from backend.app.config.database import async_engine
+from backend.app.repositories.cache import RepositoryCache
+from backend.app.services.spotify_api.auth import SpotifyAuth
+from backend.app.services.spotify_api.auth.token_manager import SpotifyTokenManager
+from backend.app.services.spotify_api.client import SpotifyClient
+from backend.app.services.spotify_api.scheduler import SpotifyScheduler
+from backend.app.services.spotify_api.single_flight import SingleFlight
+from backend.app.services.spotify_api.user_management.profile_cache import (
+    SpotifyProfileCache,
+)
+from backend.app.services.users.authenticator import Authenticator
+from backend.app.services.users.now_playing import NowPlayingHub
+from backend.app.services.users.password_hasher import PasswordHasher
+from backend.app.services.users.playback_poller import PlaybackPoller
+from backend.app.services.users.presence import PresenceStore
 from backend.app.utils.redis.redis_config import RedisConfig
 import uvicorn
 
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.app.config.logging import LOGGER
+from backend.app.settings import GLOBAL_SETTINGS
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     LOGGER.info("Startup")
-    RedisConfig().init_connection()
+    app.state.redis = RedisConfig.from_settings()
+    app.state.spotify_scheduler = SpotifyScheduler(app.state.redis)
+    await app.state.spotify_scheduler.start()
+    app.state.spotify_client = SpotifyClient.from_settings(
+        app.state.spotify_scheduler,
+        SingleFlight(
+            app.state.redis if GLOBAL_SETTINGS.SPOTIFY_SINGLE_FLIGHT_REDIS else None
+        ),
+    )
+    app.state.profile_cache = SpotifyProfileCache(app.state.redis)
+    app.state.repository_cache = RepositoryCache(app.state.redis)
+    app.state.spotify_tokens = SpotifyTokenManager(
+        app.state.redis,
+        SpotifyAuth(
+            GLOBAL_SETTINGS.SPOTIFY_CLIENT_ID,
+            GLOBAL_SETTINGS.SPOTIFY_CLIENT_SECRET,
+            app.state.spotify_client,
+        ),
+    )
+    await app.state.spotify_tokens.start()
+    app.state.password_hasher = PasswordHasher()
+    app.state.authenticator = Authenticator(app.state.redis)
+    app.state.presence = PresenceStore(app.state.redis)
+    await app.state.presence.start()
+    app.state.now_playing = NowPlayingHub(app.state.redis)
+    await app.state.now_playing.start()
+    app.state.playback_poller = PlaybackPoller(
+        app.state.redis,
+        app.state.spotify_client,
+        app.state.spotify_tokens,
+        app.state.now_playing,
+    )
+    if GLOBAL_SETTINGS.PLAYBACK_POLLER_ENABLED:
+        await app.state.playback_poller.start()
 
     yield
-    RedisConfig().close_connection()
+    await app.state.playback_poller.stop()
+    await app.state.spotify_tokens.stop()
+    await app.state.spotify_scheduler.stop()
+    await app.state.spotify_client.close()
+    # Waits for the workers off the loop, which keeps serving other tasks
+    await asyncio.to_thread(app.state.password_hasher.shutdown)
+    await app.state.presence.stop()
+    await app.state.now_playing.stop()
+    await async_engine.dispose()
+    await app.state.redis.close_connection()
     LOGGER.info("Shutdown")
 
 
@@ -31,6 +91,7 @@ app = FastAPI(
 )
 app.include_router(spotify_router, prefix="/spotify")
 app.include_router(users_router, prefix="/users")
+app.include_router(now_playing_router, prefix="/now-playing")
 
 
 app.add_middleware(
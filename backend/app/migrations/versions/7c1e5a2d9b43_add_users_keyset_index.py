@@ -0,0 +1,40 @@
+"""add users keyset index
+
+Revision ID: 7c1e5a2d9b43
+Revises: 469f5ac4bc8e
+Create Date: 2026-10-18 18:20:11.482093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1e5a2d9b43"
+down_revision: Union[str, None] = "469f5ac4bc8e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so the users table stays writable during the build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_created_at_id",
+            "users",
+            ["created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_users_created_at_id",
+            table_name="users",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,100 @@
+"""add users lookup indexes
+
+Revision ID: b3f8d1e6a027
+Revises: 7c1e5a2d9b43
+Create Date: 2026-10-18 18:41:37.905126
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3f8d1e6a027"
+down_revision: Union[str, None] = "7c1e5a2d9b43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_if_invalid(index_name: str) -> None:
+    # A failed concurrent build leaves an INVALID index under the name, which
+    # IF NOT EXISTS would then skip instead of building
+    invalid = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT 1 FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+            ),
+            {"name": index_name},
+        )
+        .first()
+    )
+    if invalid:
+        op.drop_index(index_name, postgresql_concurrently=True, if_exists=True)
+
+
+def _create_index(
+    index_name: str, table_name: str, columns: list, unique: bool = False
+) -> None:
+    _drop_if_invalid(index_name)
+    op.create_index(
+        index_name,
+        table_name,
+        columns,
+        unique=unique,
+        postgresql_concurrently=True,
+        if_not_exists=True,
+    )
+
+
+def upgrade() -> None:
+    # Built concurrently so the tables stay writable during the build. The
+    # unique indexes fail if existing rows only differ by case, such
+    # duplicates must be merged first.
+    with op.get_context().autocommit_block():
+        _create_index(
+            "uq_users_lower_email", "users", [sa.text("lower(email)")], unique=True
+        )
+        _create_index(
+            "uq_users_lower_display_name",
+            "users",
+            [sa.text("lower(display_name)")],
+            unique=True,
+        )
+        _create_index("ix_users_spotify_id", "users", ["spotify_id"])
+        _create_index(
+            "ix_friends_association_friend_id",
+            "friends_association",
+            ["friend_id", "user_id"],
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_friends_association_friend_id",
+            table_name="friends_association",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_users_spotify_id",
+            table_name="users",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "uq_users_lower_display_name",
+            table_name="users",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "uq_users_lower_email",
+            table_name="users",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy.sql import func
+import time
 import uuid
 import jwt
 
@@ -42,7 +43,7 @@ class Token(SQLModel, table=True):
     @staticmethod
     def generate_bearer_token(user_id: str) -> str:
         """
-        Generates a JWT bearer token.
+        Generates a JWT bearer token expiring after ``JWT_EXPIRES_IN`` seconds.
 
         Args:
             user_id: The ID of the user
@@ -51,7 +52,12 @@ class Token(SQLModel, table=True):
             str: The generated JWT token
         """
         secret_key = GLOBAL_SETTINGS.JWT_SECRET_KEY
-        payload = {"user_id": user_id}
+        issued_at = int(time.time())
+        payload = {
+            "user_id": user_id,
+            "iat": issued_at,
+            "exp": issued_at + GLOBAL_SETTINGS.JWT_EXPIRES_IN,
+        }
         jwt_token = jwt.encode(payload, secret_key, algorithm="HS256")
         return jwt_token
 
@@ -1,7 +1,7 @@
 from datetime import datetime
+from sqlalchemy import Index, func
 from sqlmodel import SQLModel, Field, Relationship
 import uuid
-import bcrypt
 from pydantic import EmailStr
 from backend.app.models.tokens import Token
 
@@ -12,6 +12,11 @@ class FriendAssociation(SQLModel, table=True):
     """
 
     __tablename__ = "friends_association"
+    # Serves the reverse direction (friended_by), the primary key covers
+    # lookups by user_id
+    __table_args__ = (
+        Index("ix_friends_association_friend_id", "friend_id", "user_id"),
+    )
 
     user_id: str = Field(foreign_key="users.id", primary_key=True, max_length=36)
     friend_id: str = Field(foreign_key="users.id", primary_key=True, max_length=36)
@@ -37,6 +42,10 @@ class User(UserBase, table=True):
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_spotify_id", "spotify_id"),
+    )
 
     id: str = Field(
         default_factory=lambda: str(uuid.uuid4()), primary_key=True, max_length=36
@@ -68,17 +77,10 @@ class User(UserBase, table=True):
         back_populates="user", sa_relationship_kwargs={"cascade": "all, delete-orphan"}
     )
 
-    def set_password(self, password: str) -> None:
-        """Hashes and sets the user password"""
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
-        self.password_hash = hashed_password.decode("utf-8")
 
-    def check_password(self, password: str) -> bool:
-        """Verifies the user password"""
-        return bcrypt.checkpw(
-            password.encode("utf-8"), self.password_hash.encode("utf-8")
-        )
+# Emails and display names are unique regardless of case
+Index("uq_users_lower_email", func.lower(User.email), unique=True)
+Index("uq_users_lower_display_name", func.lower(User.display_name), unique=True)
 
 
 class UserOut(UserBase):
@@ -91,14 +93,21 @@ class UserOut(UserBase):
     friends_count: int | None = None
 
     @classmethod
-    def from_user(cls, user: User, include_friends_count: bool = False):
-        """Creates a UserOut instance from a User instance"""
-        user_dict = user.model_dump(
-            exclude={"password_hash", "friended_by", "friends", "updated_at"}
+    def from_user(cls, user: User, friends_count: int | None = None):
+        """
+        Creates a UserOut instance from a User instance
+
+        The row was validated when it was stored, its fields are copied
+        without being validated again.
+        """
+        return cls.model_construct(
+            **{
+                name: getattr(user, name)
+                for name in cls.model_fields
+                if name != "friends_count"
+            },
+            friends_count=friends_count,
         )
-        if include_friends_count:
-            user_dict["friends_count"] = len(user.friends)
-        return cls(**user_dict)
 
 
 class UserCreate(UserBase):
@@ -118,6 +127,16 @@ class UserLogin(SQLModel):
     password: str
 
 
+class UserToken(SQLModel):
+    """
+    Response model for a successful login
+    """
+
+    access_token: str
+    token_type: str = "bearer"
+    user: UserOut
+
+
 class UserUpdate(SQLModel):
     """
     Model for updating user information
@@ -130,13 +149,68 @@ class UserUpdate(SQLModel):
     password: str | None = Field(default=None, min_length=8, max_length=50)
 
 
+class FriendsBatch(SQLModel):
+    """
+    Model for adding and removing many friends at once
+    """
+
+    add: list[str] = Field(default_factory=list)
+    remove: list[str] = Field(default_factory=list)
+
+
+class FriendsBatchResult(SQLModel):
+    """
+    Response model listing the friendships actually changed by a batch
+    """
+
+    added: list[str]
+    removed: list[str]
+
+
+class MutualFriends(SQLModel):
+    """
+    Response model for the friends two users have in common
+    """
+
+    total: int
+    users: list[UserOut]
+
+
+class FriendSuggestion(SQLModel):
+    """
+    Response model for a suggested friend
+    """
+
+    user: UserOut
+    mutual_friends: int
+
+
+class PresenceUpdate(SQLModel):
+    """
+    Model for a presence heartbeat
+    """
+
+    currently_playing: str | None = Field(default=None, max_length=255)
+
+
+class OnlineUsers(SQLModel):
+    """
+    Response model for the users currently online
+    """
+
+    total: int
+    users: list[UserOut]
+
+
 class PaginatedUsers(SQLModel):
     """
     Response model for paginated users list
     """
 
     total: int
+    total_is_estimate: bool = False
     users: list[UserOut]
-    page: int = Field(ge=1)
+    page: int | None = Field(default=None, ge=1)
     per_page: int = Field(ge=1, le=100)
     pages: int
+    next_cursor: str | None = None
@@ -37,3 +37,34 @@ class AbstractRepository(Generic[M, K], ABC):
     @abstractmethod
     def update(self, id: K, instance: M) -> M:
         pass
+
+
+class AbstractAsyncRepository(Generic[M, K], ABC):
+    """
+    Absract representation of an asynchronous repository
+    """
+
+    # Create a new instance of the Model
+    @abstractmethod
+    async def create(self, instance: M) -> M:
+        pass
+
+    # Fetch an existing instance of the Model by it's unique Id
+    @abstractmethod
+    async def get(self, id: K) -> M:
+        pass
+
+    # Delete an existing instance of the Model
+    @abstractmethod
+    async def delete(self, id: K) -> None:
+        pass
+
+    # Lists all existing instance of the Model
+    @abstractmethod
+    async def list(self, limit: int, start: int) -> list[M]:
+        pass
+
+    # Updates an existing instance of the Model
+    @abstractmethod
+    async def update(self, id: K, instance: M) -> M:
+        pass
@@ -0,0 +1,262 @@
+import functools
+import logging
+import random
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+# Type definition for cached values
+V = TypeVar("V")
+
+# Type definition for the decorated repository
+R = TypeVar("R")
+
+# Caches an entry unless its key or one of its tags was invalidated since the
+# lookup read the clock. KEYS: the entry, the epoch of its key, then the set
+# and the epoch of each tag.
+SET_SCRIPT = """
+for i = 2, #KEYS, 2 do
+    if tonumber(redis.call('GET', KEYS[i]) or '0') > tonumber(ARGV[1]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+for i = 3, #KEYS, 2 do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return 1
+"""
+
+# Deletes every key recorded under the given tags, then the tags themselves,
+# and stamps their epochs. KEYS: the clock, then the set and the epoch of each
+# tag.
+INVALIDATE_SCRIPT = """
+local now = redis.call('INCR', KEYS[1])
+for i = 2, #KEYS, 2 do
+    local keys = redis.call('SMEMBERS', KEYS[i])
+    for j = 1, #keys, 500 do
+        redis.call('DEL', unpack(keys, j, math.min(j + 499, #keys)))
+    end
+    redis.call('DEL', KEYS[i])
+    redis.call('SET', KEYS[i + 1], now, 'EX', ARGV[1])
+end
+return now
+"""
+
+# Deletes entries and stamps their epochs. KEYS: the clock, then each entry and
+# its epoch.
+FORGET_SCRIPT = """
+local now = redis.call('INCR', KEYS[1])
+for i = 2, #KEYS, 2 do
+    redis.call('DEL', KEYS[i])
+    redis.call('SET', KEYS[i + 1], now, 'EX', ARGV[1])
+end
+return now
+"""
+
+
+class RepositoryCache:
+    """
+    Cache-aside store for repository lookups.
+
+    - Keys are prefixed with ``version``, bumping it orphans every entry
+      written by a previous row layout.
+    - Entries expire after ``ttl`` seconds, spread by ``jitter`` so entries
+      filled together do not expire together. Lookups that found nothing are
+      cached too, for ``negative_ttl`` seconds.
+    - Each entry is recorded under tags, typically the id of the row it
+      holds, and writes invalidate tags rather than guessing the keys under
+      which a row may have been cached.
+    - Every invalidation advances a clock and stamps the epoch of the tags or
+      keys it drops with it. Lookups read the clock along with the entry, and
+      a lookup that read the database while one of its tags or its key was
+      invalidated does not cache what it read, which may predate the write.
+      Writes to other rows leave it alone.
+
+    Redis errors are logged and reads fall back to the repository, the cache
+    never fails a request.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        ttl: int = GLOBAL_SETTINGS.REPOSITORY_CACHE_TTL,
+        negative_ttl: int = GLOBAL_SETTINGS.REPOSITORY_CACHE_NEGATIVE_TTL,
+        jitter: float = GLOBAL_SETTINGS.REPOSITORY_CACHE_JITTER,
+        version: int = GLOBAL_SETTINGS.REPOSITORY_CACHE_VERSION,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.jitter = jitter
+        self.prefix = f"repo:v{version}"
+        self.clock_key = f"{self.prefix}:clock"
+        # Tags and epochs outlive the entries they guard
+        self.tag_expire = int(ttl * (1 + jitter)) + 1
+        self._set = redis.connection.register_script(SET_SCRIPT)
+        self._invalidate = redis.connection.register_script(INVALIDATE_SCRIPT)
+        self._forget = redis.connection.register_script(FORGET_SCRIPT)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _epoch_key(self, key: str) -> str:
+        # Under its own prefix, a key argument ending in :epoch cannot clash
+        return f"{self.prefix}:epoch{key.removeprefix(self.prefix)}"
+
+    def _expire(self, ttl: int) -> int:
+        return max(1, round(ttl * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+    async def get(self, namespace: str, key: str) -> tuple[dict[str, Any] | None, int]:
+        """
+        Reads an entry along with the current clock.
+
+        Returns:
+            tuple[dict[str, Any] | None, int]: The entry, its ``value`` being
+                None for a cached miss, or None if nothing is cached, and the
+                clock to pass to ``set``
+        """
+        entry, clock = await self.redis.mget(
+            [self._key(namespace, key), self.clock_key]
+        )
+        return entry, clock or 0
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        clock: int,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """
+        Caches a value, None recording that the lookup found nothing.
+
+        Args:
+            namespace: Kind of lookup, e.g. ``user:id``
+            key: Argument of the lookup
+            value: JSON-compatible value
+            clock: Clock read by ``get`` before the value was looked up
+            tags: Tags the entry is invalidated with
+
+        Returns:
+            bool: False if the key or a tag was invalidated since, and nothing
+                was cached
+        """
+        cache_key = self._key(namespace, key)
+        expire = self._expire(self.ttl if value is not None else self.negative_ttl)
+        keys = [cache_key, self._epoch_key(cache_key)]
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys += [tag_key, self._epoch_key(tag_key)]
+        try:
+            return bool(
+                await self._set(
+                    keys=keys,
+                    args=[
+                        clock,
+                        self.redis.codec.encode({"value": value}),
+                        expire,
+                        self.tag_expire,
+                    ],
+                )
+            )
+        except RedisError as e:
+            logger.error(f"Error caching {cache_key}: {e}")
+            return False
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drops every entry recorded under the given tags."""
+        keys = [self.clock_key]
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys += [tag_key, self._epoch_key(tag_key)]
+        try:
+            await self._invalidate(keys=keys, args=[self.tag_expire])
+        except RedisError as e:
+            logger.error(f"Error invalidating {', '.join(tags)}: {e}")
+
+    async def forget(self, namespace: str, *keys: str) -> None:
+        """Drops entries by key, e.g. cached misses a write just filled."""
+        script_keys = [self.clock_key]
+        for key in keys:
+            cache_key = self._key(namespace, key)
+            script_keys += [cache_key, self._epoch_key(cache_key)]
+        try:
+            await self._forget(keys=script_keys, args=[self.tag_expire])
+        except RedisError as e:
+            logger.error(f"Error dropping {namespace} entries: {e}")
+
+
+def cached(
+    namespace: str,
+    encode: Callable[[V], Any],
+    decode: Callable[[Any], V],
+    tags: Callable[[V], Iterable[str]],
+    key: Callable[[str], str] = str,
+) -> Callable[
+    [Callable[[R, str], Awaitable[V | None]]], Callable[[R, str], Awaitable[V | None]]
+]:
+    """
+    Caches a repository lookup taking a single key.
+
+    The repository exposes its ``RepositoryCache`` as ``cache``, lookups go
+    straight to the database when it is None. Writes of the repository are in
+    charge of invalidating the tags of the rows they change.
+
+    Args:
+        namespace: Kind of lookup, part of the Redis key
+        encode: Converts a found value into a JSON-compatible object
+        decode: Rebuilds a value from its JSON-compatible form
+        tags: Tags of a found value, e.g. ``user:{id}``
+        key: Normalizes the argument into the cache key
+    """
+
+    def decorator(
+        method: Callable[[R, str], Awaitable[V | None]],
+    ) -> Callable[[R, str], Awaitable[V | None]]:
+        @functools.wraps(method)
+        async def lookup(self: R, arg: str) -> V | None:
+            cache: RepositoryCache | None = getattr(self, "cache", None)
+            if cache is None:
+                return await method(self, arg)
+
+            cache_key = key(arg)
+            entry, clock = await cache.get(namespace, cache_key)
+            if entry is not None:
+                try:
+                    value = entry["value"]
+                    return decode(value) if value is not None else None
+                except Exception as e:
+                    logger.warning(f"Ignoring undecodable {namespace} entry: {e}")
+
+            found = await method(self, arg)
+            if found is None:
+                await cache.set(namespace, cache_key, None, clock)
+            else:
+                await cache.set(namespace, cache_key, encode(found), clock, tags(found))
+            return found
+
+        return lookup
+
+    return decorator
+
+
+def get_repository_cache(request: Request) -> RepositoryCache:
+    """
+    Provides the repository cache created in the application lifespan.
+
+    Returns:
+        RepositoryCache: The process-wide repository cache
+    """
+    return request.app.state.repository_cache
@@ -1,20 +1,33 @@
 import logging
 from typing import Optional, Sequence
 
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from backend.app.models.tokens import Token
 from backend.app.models.users import User
-from backend.app.repositories.base_repository import AbstractRepository
+from backend.app.repositories.base_repository import AbstractAsyncRepository
+from backend.app.services.users.authenticator import Authenticator
 
 logger = logging.getLogger(__name__)
 
 
-class TokenRepository(AbstractRepository[Token, str]):
-    def __init__(self, db: Session):
+class TokenRepository(AbstractAsyncRepository[Token, str]):
+    def __init__(self, db: AsyncSession, authenticator: Authenticator | None = None):
+        """
+        Args:
+            db: Database session
+            authenticator: When given, tokens replaced, deactivated or deleted
+                are revoked so they stop authenticating requests
+        """
         self.db = db
+        self.authenticator = authenticator
+
+    async def _revoke(self, token: str) -> None:
+        if self.authenticator is not None:
+            await self.authenticator.revoke(token)
 
-    def get(self, user_id: str) -> Optional[Token]:
+    async def get(self, user_id: str) -> Optional[Token]:
         """
         Retrieve a token for a specific user.
 
@@ -29,12 +42,12 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).where(Token.user_id == user_id)
-            return self.db.exec(statement).first()
+            return (await self.db.exec(statement)).first()
         except Exception as e:
             logger.error(f"Error retrieving token for user {user_id}: {str(e)}")
             raise
 
-    def get_all_active_tokens(self) -> Sequence[Token]:
+    async def get_all_active_tokens(self) -> Sequence[Token]:
         """
         Retrieve all active tokens.
 
@@ -46,12 +59,12 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).where(Token.is_active == True)
-            return self.db.exec(statement).all()
+            return (await self.db.exec(statement)).all()
         except Exception as e:
             logger.error(f"Error retrieving active tokens: {str(e)}")
             raise
 
-    def create(self, user: User) -> Token:
+    async def create(self, user: User) -> Token:
         """
         Create a new token for a user.
 
@@ -71,18 +84,18 @@ class TokenRepository(AbstractRepository[Token, str]):
             )
 
             self.db.add(new_token)
-            self.db.commit()
-            self.db.refresh(new_token)
+            await self.db.commit()
+            await self.db.refresh(new_token)
 
             logger.info(f"Successfully created token for user ID: {user.id}")
             return new_token
 
         except Exception as e:
             logger.error(f"Error creating token for user {user.id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def delete(self, user_id: str) -> bool:
+    async def delete(self, user_id: str) -> bool:
         """
         Delete a user's token.
 
@@ -96,20 +109,21 @@ class TokenRepository(AbstractRepository[Token, str]):
             Exception: If there's an error during deletion
         """
         try:
-            token = self.get(user_id)
+            token = await self.get(user_id)
             if token:
-                self.db.delete(token)
-                self.db.commit()
+                await self.db.delete(token)
+                await self.db.commit()
+                await self._revoke(token.token)
                 logger.info(f"Successfully deleted token for user ID: {user_id}")
                 return True
             logger.info(f"No token found to delete for user ID: {user_id}")
             return False
         except Exception as e:
             logger.error(f"Error deleting token for user {user_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def list(self, limit: int = 10, start: int = 0) -> Sequence[Token]:
+    async def list(self, limit: int = 10, start: int = 0) -> Sequence[Token]:
         """
         Retrieve a list of tokens with pagination.
 
@@ -125,12 +139,12 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).offset(start).limit(limit)
-            return self.db.exec(statement).all()
+            return (await self.db.exec(statement)).all()
         except Exception as e:
             logger.error(f"Error listing tokens: {str(e)}")
             raise
 
-    def update(self, user_id: str, update_data: dict) -> Optional[Token]:
+    async def update(self, user_id: str, update_data: dict) -> Optional[Token]:
         """
         Update a token's data.
 
@@ -146,31 +160,34 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).where(Token.user_id == user_id)
-            db_token = self.db.exec(statement).first()
+            db_token = (await self.db.exec(statement)).first()
 
             if not db_token:
                 logger.info(f"No token found to update for user ID: {user_id}")
                 return None
 
+            previous_token = db_token.token
             for field, value in update_data.items():
                 if value is not None and hasattr(db_token, field):
                     setattr(db_token, field, value)
 
             self.db.add(db_token)
-            self.db.commit()
-            self.db.refresh(db_token)
+            await self.db.commit()
+            await self.db.refresh(db_token)
+            if db_token.token != previous_token or not db_token.is_active:
+                await self._revoke(previous_token)
 
             logger.info(f"Successfully updated token for user ID: {user_id}")
             return db_token
 
         except Exception as e:
             logger.error(f"Error updating token for user {user_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def deactivate(self, user_id: str) -> bool:
+    async def deactivate(self, user_id: str) -> bool:
         """
-        Deactivate a user's token.
+        Deactivate a user's token, revoking it when an authenticator is set.
 
         Args:
             user_id: The ID of the user whose token to deactivate
@@ -182,12 +199,12 @@ class TokenRepository(AbstractRepository[Token, str]):
             Exception: If there's an error during deactivation
         """
         try:
-            return self.update(user_id, {"is_active": False}) is not None
+            return await self.update(user_id, {"is_active": False}) is not None
         except Exception as e:
             logger.error(f"Error deactivating token for user {user_id}: {str(e)}")
             raise
 
-    def refresh_token(self, user_id: str) -> Optional[Token]:
+    async def refresh_token(self, user_id: str) -> Optional[Token]:
         """
         Refresh a user's token.
 
@@ -202,27 +219,29 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).where(Token.user_id == user_id)
-            db_token = self.db.exec(statement).first()
+            db_token = (await self.db.exec(statement)).first()
 
             if not db_token:
                 logger.info(f"No token found to refresh for user ID: {user_id}")
                 return None
 
+            previous_token = db_token.token
             db_token.token = Token.generate_bearer_token(user_id)
 
             self.db.add(db_token)
-            self.db.commit()
-            self.db.refresh(db_token)
+            await self.db.commit()
+            await self.db.refresh(db_token)
+            await self._revoke(previous_token)
 
             logger.info(f"Successfully refreshed token for user ID: {user_id}")
             return db_token
 
         except Exception as e:
             logger.error(f"Error refreshing token for user {user_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def get_by_token(self, token: str) -> Optional[Token]:
+    async def get_by_token(self, token: str) -> Optional[Token]:
         """
         Retrieve a token by its token string.
 
@@ -237,7 +256,7 @@ class TokenRepository(AbstractRepository[Token, str]):
         """
         try:
             statement = select(Token).where(Token.token == token)
-            return self.db.exec(statement).first()
+            return (await self.db.exec(statement)).first()
         except Exception as e:
             logger.error(f"Error retrieving token: {str(e)}")
             raise
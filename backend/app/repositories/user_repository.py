@@ -1,41 +1,251 @@
+import functools
+from datetime import datetime
 from typing import Optional, List, Sequence
 
-from sqlmodel import Session, select
-from backend.app.models.users import User
-from backend.app.repositories.base_repository import AbstractRepository
+from sqlalchemy import (
+    BigInteger,
+    String,
+    cast,
+    column,
+    delete,
+    exists,
+    insert,
+    literal,
+    table,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, selectinload
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.app.models.users import FriendAssociation, User
+from backend.app.repositories.base_repository import AbstractAsyncRepository
+from backend.app.repositories.cache import RepositoryCache, cached
+from backend.app.utils.exceptions import EmailAlreadyExistsError, UserAlreadyExistsError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Catalog table holding the planner's row estimate of every relation
+pg_class = table("pg_class", column("oid"), column("reltuples"))
+
+# Unique constraints mapped to the error raised when they are violated
+UNIQUE_VIOLATIONS = {
+    "uq_users_lower_email": (EmailAlreadyExistsError, "Email already in use"),
+    "uq_users_lower_display_name": (
+        UserAlreadyExistsError,
+        "Display name already in use",
+    ),
+}
+
+
+# Namespaces of the cached lookups
+BY_ID = "user:id"
+BY_DISPLAY_NAME = "user:display_name"
+BY_DISPLAY_NAME_WITH_FRIENDS_COUNT = "user:display_name:friends_count"
+BY_SPOTIFY_ID = "user:spotify_id"
+
+
+def _user_tag(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def _encode_user(user: User) -> dict:
+    # The password hash stays out of Redis, login reads users uncached
+    return user.model_dump(mode="json", exclude={"password_hash"})
+
+
+def _decode_user(data: dict) -> User:
+    return User.model_validate({**data, "password_hash": ""})
 
-class UserRepository(AbstractRepository[User, str]):
-    def __init__(self, db: Session):
-        self.db = db
 
-    def get(self, id: str) -> Optional[User]:
+cached_user = functools.partial(
+    cached,
+    encode=_encode_user,
+    decode=_decode_user,
+    tags=lambda user: [_user_tag(user.id)],
+)
+
+
+class UserRepository(AbstractAsyncRepository[User, str]):
+    """
+    Users and their friendships.
+
+    Given a ``RepositoryCache``, lookups by id, display name and Spotify id are
+    served from Redis and writes invalidate the entries of the users they
+    change. Cached users are detached from the session and carry no password
+    hash, they must not be modified and added back.
+    """
+
+    def __init__(self, db: AsyncSession, cache: RepositoryCache | None = None):
+        self.db = db
+        self.cache = cache
+
+    async def _invalidate(self, *user_ids: str) -> None:
+        """Drops the cached lookups of some users."""
+        if self.cache is not None and user_ids:
+            await self.cache.invalidate(*map(_user_tag, user_ids))
+
+    async def _forget_misses(self, user: User) -> None:
+        """Drops the cached misses of lookups a user now answers."""
+        if self.cache is None:
+            return
+        display_name = user.display_name.lower()
+        await self.cache.forget(BY_DISPLAY_NAME, display_name)
+        await self.cache.forget(BY_DISPLAY_NAME_WITH_FRIENDS_COUNT, display_name)
+        if user.spotify_id:
+            await self.cache.forget(BY_SPOTIFY_ID, user.spotify_id)
+
+    @cached_user(BY_ID)
+    async def get(self, id: str) -> Optional[User]:
         statement = select(User).where(User.id == id)
-        return self.db.exec(statement).first()
+        return (await self.db.exec(statement)).first()
 
-    def get_by_spotify_id(self, spotify_id: str) -> Optional[User]:
+    async def get_many(self, ids: Sequence[str]) -> Sequence[User]:
+        statement = select(User).where(User.id.in_(set(ids)))
+        return (await self.db.exec(statement)).all()
+
+    @cached_user(BY_SPOTIFY_ID)
+    async def get_by_spotify_id(self, spotify_id: str) -> Optional[User]:
         statement = select(User).where(User.spotify_id == spotify_id)
-        return self.db.exec(statement).first()
+        return (await self.db.exec(statement)).first()
+
+    async def get_ids_by_spotify_ids(
+        self, spotify_ids: Sequence[str]
+    ) -> dict[str, str]:
+        """
+        Maps Spotify ids to user ids in one query.
+
+        Args:
+            spotify_ids: Spotify ids of the users
+
+        Returns:
+            dict[str, str]: User id by Spotify id, unknown ids are omitted
+        """
+        statement = select(User.spotify_id, User.id).where(
+            User.spotify_id.in_(set(spotify_ids))
+        )
+        return dict((await self.db.exec(statement)).all())
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        statement = select(User).where(func.lower(User.email) == email.lower())
+        return (await self.db.exec(statement)).first()
+
+    @cached_user(BY_DISPLAY_NAME, key=str.lower)
+    async def get_by_display_name(self, display_name: str) -> Optional[User]:
+        statement = select(User).where(
+            func.lower(User.display_name) == display_name.lower()
+        )
+        return (await self.db.exec(statement)).first()
+
+    @cached(
+        BY_DISPLAY_NAME_WITH_FRIENDS_COUNT,
+        encode=lambda row: [_encode_user(row[0]), row[1]],
+        decode=lambda data: (_decode_user(data[0]), data[1]),
+        tags=lambda row: [_user_tag(row[0].id)],
+        key=str.lower,
+    )
+    async def get_by_display_name_with_friends_count(
+        self, display_name: str
+    ) -> Optional[tuple[User, int]]:
+        """
+        Retrieves a user by display name along with their number of friends.
 
-    def get_by_email(self, email: str) -> Optional[User]:
-        statement = select(User).where(User.email == email)
-        return self.db.exec(statement).first()
+        Args:
+            display_name: The user's display name
 
-    def get_by_display_name(self, display_name: str) -> Optional[User]:
-        statement = select(User).where(User.display_name == display_name)
-        return self.db.exec(statement).first()
+        Returns:
+            Optional[tuple[User, int]]: The user and their friends count, or None
+        """
+        statement = select(User, self._friends_count()).where(
+            func.lower(User.display_name) == display_name.lower()
+        )
+        return (await self.db.exec(statement)).first()
 
-    def list(self, limit: int, start: int) -> Sequence[User]:
+    async def list(self, limit: int, start: int) -> Sequence[User]:
         statement = select(User).limit(limit).offset(start)
-        return self.db.exec(statement).all()
+        return (await self.db.exec(statement)).all()
+
+    async def list_with_friends_count(
+        self,
+        limit: int,
+        start: int = 0,
+        after: tuple[datetime, str] | None = None,
+    ) -> Sequence[tuple[User, int]]:
+        """
+        Lists users along with their number of friends in a single query.
+
+        Users are ordered by (created_at, id). Passing ``after`` seeks past
+        that position instead of skipping rows, so deep pages cost the same
+        as the first one.
+
+        Args:
+            limit: Maximum number of users to return
+            start: Number of users to skip
+            after: (created_at, id) of the last user of the previous page
+
+        Returns:
+            Sequence[tuple[User, int]]: Users paired with their friends count
+        """
+        statement = select(User, self._friends_count())
+        if after is not None:
+            statement = statement.where(tuple_(User.created_at, User.id) > after)
+        statement = (
+            statement.order_by(User.created_at, User.id).limit(limit).offset(start)
+        )
+        return (await self.db.exec(statement)).all()
+
+    async def count(self) -> int:
+        """Counts every user."""
+        return (await self.db.exec(select(func.count(User.id)))).one()
+
+    async def estimate_count(self) -> int:
+        """
+        Returns the planner's estimate of the number of users.
+
+        Reads ``pg_class.reltuples``, which autovacuum keeps up to date, and
+        falls back to an exact count if the table was never analyzed.
+        """
+        statement = select(cast(pg_class.c.reltuples, BigInteger)).where(
+            pg_class.c.oid == func.to_regclass(User.__tablename__)
+        )
+        estimate = (await self.db.exec(statement)).first()
+        if estimate is None or estimate < 0:
+            return await self.count()
+        return estimate
+
+    @staticmethod
+    def _raise_unique_violation(error: IntegrityError) -> None:
+        """Raises the domain error matching a violated unique constraint, if any."""
+        constraint = getattr(error.orig.__cause__, "constraint_name", None)
+        if constraint in UNIQUE_VIOLATIONS:
+            exception, message = UNIQUE_VIOLATIONS[constraint]
+            raise exception(message) from error
+
+    @staticmethod
+    def _friends_count():
+        """
+        Correlated COUNT over friends_association.
 
-    def create(self, user_data: dict) -> User:
+        Resolved with the association primary key for each selected row, so
+        friend rows are never loaded.
+        """
+        return (
+            select(func.count())
+            .select_from(FriendAssociation)
+            .where(FriendAssociation.user_id == User.id)
+            .scalar_subquery()
+            .label("friends_count")
+        )
+
+    async def create(self, user_data: dict) -> User:
         """
         Creates a new user with validated data.
 
+        Uniqueness is enforced by the database in the same INSERT ... RETURNING
+        statement instead of being checked beforehand.
+
         Args:
             user_data: Dictionary containing user data
 
@@ -43,27 +253,31 @@ class UserRepository(AbstractRepository[User, str]):
             User: The created user instance
 
         Raises:
+            EmailAlreadyExistsError: If the email is already in use
+            UserAlreadyExistsError: If the display name is already in use
             Exception: If there's an error during user creation
         """
         try:
-            logger.info(f"Creating user with data: {user_data}")
+            logger.info(f"Creating user with email: {user_data.get('email')}")
             user = User(**user_data)
 
-            if "password" in user_data:
-                user.set_password(user_data["password"])
-
-            self.db.add(user)
-            self.db.commit()
-            self.db.refresh(user)
+            statement = insert(User).values(**user.model_dump()).returning(User)
+            user = (await self.db.execute(statement)).scalar_one()
+            await self.db.commit()
+            await self._forget_misses(user)
 
             logger.info(f"Successfully created user with ID: {user.id}")
             return user
+        except IntegrityError as e:
+            await self.db.rollback()
+            self._raise_unique_violation(e)
+            raise
         except Exception as e:
             logger.error(f"Error creating user: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def update(self, id: str, update_data: dict) -> Optional[User]:
+    async def update(self, id: str, update_data: dict) -> Optional[User]:
         """
         Updates a user with the provided data.
 
@@ -75,29 +289,36 @@ class UserRepository(AbstractRepository[User, str]):
             Optional[User]: The updated user or None if not found
 
         Raises:
+            EmailAlreadyExistsError: If the new email is already in use
+            UserAlreadyExistsError: If the new display name is already in use
             Exception: If there's an error during update
         """
         try:
-            db_user = self.get(id)
+            # Loaded in the session, a cached user could not be added back
+            statement = select(User).where(User.id == id)
+            db_user = (await self.db.exec(statement)).first()
             if not db_user:
                 return None
 
             for field, value in update_data.items():
                 if value is not None and hasattr(db_user, field):
-                    if field == "password":
-                        db_user.set_password(value)
-                    else:
-                        setattr(db_user, field, value)
+                    setattr(db_user, field, value)
 
             self.db.add(db_user)
-            self.db.commit()
-            self.db.refresh(db_user)
+            await self.db.commit()
+            await self.db.refresh(db_user)
+            await self._invalidate(id)
+            await self._forget_misses(db_user)
             return db_user
+        except IntegrityError as e:
+            await self.db.rollback()
+            self._raise_unique_violation(e)
+            raise
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def delete(self, id: str) -> bool:
+    async def delete(self, id: str) -> bool:
         """
         Deletes a user by ID.
 
@@ -111,17 +332,32 @@ class UserRepository(AbstractRepository[User, str]):
             Exception: If there's an error during deletion
         """
         try:
-            user = self.get(id)
+            # Collections touched by the delete cascade must be loaded up
+            # front, lazy loading is not available on an AsyncSession.
+            statement = (
+                select(User)
+                .where(User.id == id)
+                .options(
+                    selectinload(User.tokens),
+                    selectinload(User.friends),
+                    selectinload(User.friended_by),
+                )
+            )
+            user = (await self.db.exec(statement)).first()
             if user:
-                self.db.delete(user)
-                self.db.commit()
+                # Deleting the friendships changes the friends count of the
+                # users who had this one as a friend
+                friended_by = [friend.id for friend in user.friended_by]
+                await self.db.delete(user)
+                await self.db.commit()
+                await self._invalidate(id, *friended_by)
                 return True
             return False
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def add_friend(self, user_id: str, friend_id: str) -> bool:
+    async def add_friend(self, user_id: str, friend_id: str) -> bool:
         """
         Adds a friendship relationship between two users.
 
@@ -135,27 +371,10 @@ class UserRepository(AbstractRepository[User, str]):
         Raises:
             Exception: If there's an error during the operation
         """
-        try:
-            statement_user = select(User).where(User.id == user_id)
-            statement_friend = select(User).where(User.id == friend_id)
-
-            user = self.db.exec(statement_user).first()
-            friend = self.db.exec(statement_friend).first()
-
-            if not user or not friend:
-                return False
-
-            if friend not in user.friends:
-                user.friends.append(friend)
-                self.db.commit()
-                return True
+        added, _ = await self.update_friends(user_id, add_ids=[friend_id])
+        return bool(added)
 
-            return False
-        except Exception as e:
-            self.db.rollback()
-            raise
-
-    def remove_friend(self, user_id: str, friend_id: str) -> bool:
+    async def remove_friend(self, user_id: str, friend_id: str) -> bool:
         """
         Removes a friendship relationship between two users.
 
@@ -169,27 +388,108 @@ class UserRepository(AbstractRepository[User, str]):
         Raises:
             Exception: If there's an error during the operation
         """
-        try:
-            statement_user = select(User).where(User.id == user_id)
-            statement_friend = select(User).where(User.id == friend_id)
+        _, removed = await self.update_friends(user_id, remove_ids=[friend_id])
+        return bool(removed)
+
+    async def update_friends(
+        self,
+        user_id: str,
+        add_ids: Sequence[str] = (),
+        remove_ids: Sequence[str] = (),
+    ) -> tuple[List[str], List[str]]:
+        """
+        Adds and removes many friends of a user in one transaction.
 
-            user = self.db.exec(statement_user).first()
-            friend = self.db.exec(statement_friend).first()
+        Each direction is a single set-based statement on friends_association,
+        so the cost does not depend on how many friends the user already has.
+        Unknown users, the user themselves and existing friendships are
+        skipped when adding.
 
-            if not user or not friend:
-                return False
+        Args:
+            user_id: ID of the user whose friends change
+            add_ids: IDs of the users to add as friends
+            remove_ids: IDs of the users to remove from friends
 
-            if friend in user.friends:
-                user.friends.remove(friend)
-                self.db.commit()
-                return True
+        Returns:
+            tuple[List[str], List[str]]: IDs actually added and actually removed
 
-            return False
+        Raises:
+            Exception: If there's an error during the operation
+        """
+        try:
+            added: List[str] = []
+            removed: List[str] = []
+
+            if add_ids:
+                owner = aliased(User)
+                candidates = select(literal(user_id, String), User.id).where(
+                    User.id.in_(set(add_ids)),
+                    User.id != user_id,
+                    exists().where(owner.id == user_id),
+                )
+                statement = (
+                    pg_insert(FriendAssociation)
+                    .from_select(["user_id", "friend_id"], candidates)
+                    .on_conflict_do_nothing()
+                    .returning(FriendAssociation.friend_id)
+                )
+                added = list((await self.db.exec(statement)).scalars())
+
+            if remove_ids:
+                statement = (
+                    delete(FriendAssociation)
+                    .where(
+                        FriendAssociation.user_id == user_id,
+                        FriendAssociation.friend_id.in_(set(remove_ids)),
+                    )
+                    .returning(FriendAssociation.friend_id)
+                )
+                removed = list((await self.db.exec(statement)).scalars())
+
+            await self.db.commit()
+            if added or removed:
+                # Only the user's own friends count changes
+                await self._invalidate(user_id)
+            return added, removed
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def get_friends(self, user_id: str) -> List[User]:
+    async def get_friend_ids(self, user_ids: Sequence[str]) -> dict[str, List[str]]:
+        """
+        Retrieves the friend ids of many users in one query.
+
+        Args:
+            user_ids: IDs of the users
+
+        Returns:
+            dict[str, List[str]]: Friend ids by user id, users without friends
+                are omitted
+        """
+        statement = select(
+            FriendAssociation.user_id, FriendAssociation.friend_id
+        ).where(FriendAssociation.user_id.in_(set(user_ids)))
+        friend_ids: dict[str, List[str]] = {}
+        for user_id, friend_id in await self.db.exec(statement):
+            friend_ids.setdefault(user_id, []).append(friend_id)
+        return friend_ids
+
+    async def get_friended_by_ids(self, user_id: str) -> List[str]:
+        """
+        Retrieves the ids of the users who have a user as friend.
+
+        Args:
+            user_id: The user's ID
+
+        Returns:
+            List[str]: IDs of the users having this user as friend
+        """
+        statement = select(FriendAssociation.user_id).where(
+            FriendAssociation.friend_id == user_id
+        )
+        return list((await self.db.exec(statement)).all())
+
+    async def get_friends(self, user_id: str) -> List[User]:
         """
         Retrieves the list of friends for a user.
 
@@ -199,6 +499,8 @@ class UserRepository(AbstractRepository[User, str]):
         Returns:
             List[User]: List of user's friends, empty list if user not found
         """
-        statement = select(User).where(User.id == user_id)
-        user = self.db.exec(statement).first()
+        statement = (
+            select(User).where(User.id == user_id).options(selectinload(User.friends))
+        )
+        user = (await self.db.exec(statement)).first()
         return user.friends if user else []
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from typing import Annotated, AsyncIterator
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+
+from backend.app.config.database import async_session_factory
+from backend.app.config.logging import LOGGER
+from backend.app.repositories.user_repository import UserRepository
+from backend.app.services.spotify_api.schemas.player import CurrentlyPlaying
+from backend.app.services.users.friend_graph import FriendGraph
+from backend.app.services.users.now_playing import (
+    NowPlaying,
+    NowPlayingHub,
+    Subscription,
+    get_now_playing_hub,
+)
+from backend.app.services.users.presence import PresenceStore, get_presence_store
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+now_playing_router = APIRouter()
+
+
+async def _friend_ids(redis: RedisConfig, user_id: str) -> list[str] | None:
+    """
+    Looks up the friends of a user, None if the user does not exist.
+
+    Uses its own short-lived session, streaming endpoints must not hold a
+    pooled connection for as long as the client stays connected.
+    """
+    async with async_session_factory() as db:
+        user_repository = UserRepository(db)
+        if not await user_repository.get(user_id):
+            return None
+        return await FriendGraph(redis, user_repository).friend_ids(user_id)
+
+
+async def _frames(
+    hub: NowPlayingHub, subscription: Subscription
+) -> AsyncIterator[dict | None]:
+    """
+    Yields the snapshot of every friend, then their deltas as they arrive.
+
+    Yields None when nothing changed for a keepalive period.
+    """
+    yield {"type": "snapshot", "friends": await hub.snapshot(subscription.user_ids)}
+    while True:
+        batch = await subscription.next_batch(GLOBAL_SETTINGS.NOW_PLAYING_KEEPALIVE)
+        if not batch:
+            yield None
+        for user_id, changes in batch.items():
+            yield {"type": "delta", "user_id": user_id, "changes": changes}
+
+
+@now_playing_router.put("/{user_id}", tags=["now-playing"], status_code=204)
+async def publish_now_playing(
+    user_id: str,
+    currently_playing: CurrentlyPlaying,
+    hub: Annotated[NowPlayingHub, Depends(get_now_playing_hub)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+) -> None:
+    """
+    Reports what a user is playing and notifies their friends of the changes.
+
+    Args:
+        user_id: User's ID
+        currently_playing: Spotify playback state of the user
+        hub: Now playing hub
+        presence: Presence store
+    """
+    try:
+        now_playing = NowPlaying.from_currently_playing(currently_playing)
+        await hub.publish(user_id, now_playing)
+        await presence.heartbeat(
+            user_id, now_playing.track_name if now_playing.is_playing else None
+        )
+    except Exception as e:
+        LOGGER.error(f"Error publishing now playing: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@now_playing_router.websocket("/{user_id}/ws")
+async def now_playing_ws(
+    websocket: WebSocket,
+    user_id: str,
+    hub: Annotated[NowPlayingHub, Depends(get_now_playing_hub)],
+) -> None:
+    """
+    Streams what the friends of a user are playing over a WebSocket.
+
+    The first message is a snapshot of every friend, the following ones only
+    carry changed fields. Friends added after connecting are picked up on
+    the next connection.
+    """
+    friend_ids = await _friend_ids(websocket.app.state.redis, user_id)
+    if friend_ids is None:
+        await websocket.close(code=4404, reason="User not found")
+        return
+
+    await websocket.accept()
+    try:
+        async with hub.subscription(friend_ids) as subscription:
+            async for frame in _frames(hub, subscription):
+                if frame is None:
+                    frame = {"type": "keepalive"}
+                await asyncio.wait_for(
+                    websocket.send_json(frame),
+                    GLOBAL_SETTINGS.NOW_PLAYING_SEND_TIMEOUT,
+                )
+    except WebSocketDisconnect:
+        pass
+    except asyncio.TimeoutError:
+        # The client stopped reading, its socket buffer is full
+        await websocket.close(code=1013, reason="Consumer too slow")
+
+
+@now_playing_router.get("/{user_id}/stream", tags=["now-playing"])
+async def now_playing_stream(
+    user_id: str,
+    request: Request,
+    hub: Annotated[NowPlayingHub, Depends(get_now_playing_hub)],
+) -> StreamingResponse:
+    """
+    Server-sent events fallback of the now playing WebSocket.
+
+    Args:
+        user_id: User's ID
+        request: Incoming request, used to detect disconnects
+        hub: Now playing hub
+
+    Raises:
+        HTTPException: If user not found
+    """
+    friend_ids = await _friend_ids(request.app.state.redis, user_id)
+    if friend_ids is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def events() -> AsyncIterator[str]:
+        async with hub.subscription(friend_ids) as subscription:
+            async for frame in _frames(hub, subscription):
+                if await request.is_disconnected():
+                    return
+                if frame is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
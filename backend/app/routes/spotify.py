@@ -1,23 +1,60 @@
+from math import ceil
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Header, HTTPException
 
 from backend.app.config.logging import LOGGER
 from backend.app.services.spotify_api.auth import SpotifyAuth
-from backend.app.services.spotify_api.schemas.spotify_user import SpotifyUser
+from backend.app.services.spotify_api.auth.token_manager import (
+    SpotifyTokenManager,
+    get_token_manager,
+)
+from backend.app.services.spotify_api.client import SpotifyClient, get_spotify_client
+from backend.app.services.spotify_api.exceptions import (
+    SpotifyAuthenticationException,
+    SpotifyRateLimitException,
+)
+from backend.app.services.spotify_api.scheduler import (
+    SchedulerStats,
+    SpotifyScheduler,
+    get_spotify_scheduler,
+)
+from backend.app.services.spotify_api.schemas.spotify_user import (
+    SpotifyUser,
+    SpotifyUsersBatch,
+)
+from backend.app.services.spotify_api.schemas.token import SpotifyToken
+from backend.app.services.spotify_api.user_management.profile_cache import (
+    SpotifyProfileCache,
+    get_profile_cache,
+)
 from backend.app.services.spotify_api.user_management.user_manager import UserManager
+from backend.app.services.users.playback_poller import (
+    PlaybackPoller,
+    PollerStats,
+    get_playback_poller,
+)
 from backend.app.settings import GLOBAL_SETTINGS
-from backend.app.utils.redis.redis_config import RedisConfig
 
 spotify_router = APIRouter()
 
 
-def get_spotify_auth() -> SpotifyAuth:
+def get_spotify_auth(
+    client: Annotated[SpotifyClient, Depends(get_spotify_client)],
+) -> SpotifyAuth:
     return SpotifyAuth(
-        GLOBAL_SETTINGS.SPOTIFY_CLIENT_ID, GLOBAL_SETTINGS.SPOTIFY_CLIENT_SECRET
+        GLOBAL_SETTINGS.SPOTIFY_CLIENT_ID,
+        GLOBAL_SETTINGS.SPOTIFY_CLIENT_SECRET,
+        client,
     )
 
 
+def rate_limited(err: SpotifyRateLimitException) -> HTTPException:
+    """Maps a Spotify rate limit error to a 429 carrying Retry-After."""
+    headers = {"Retry-After": str(ceil(err.retry_after))} if err.retry_after else None
+    return HTTPException(status_code=429, detail=str(err), headers=headers)
+
+
 @spotify_router.get("/health-check", tags=["spotify"])
 def health_check():
     return {"status": "ok"}
@@ -38,30 +75,55 @@ def authorize_user(auth: Annotated[SpotifyAuth, Depends(get_spotify_auth)]):
 
 @spotify_router.get("/callback", tags=["spotify"], status_code=200)
 async def spotify_callback(
-    redis: Annotated[RedisConfig, Depends()],
+    auth: Annotated[SpotifyAuth, Depends(get_spotify_auth)],
+    tokens: Annotated[SpotifyTokenManager, Depends(get_token_manager)],
+    client: Annotated[SpotifyClient, Depends(get_spotify_client)],
+    cache: Annotated[SpotifyProfileCache, Depends(get_profile_cache)],
+    code: str | None = None,
     authorization: str = Header(None),
 ):
     """
-    Retrieves the access token from the frontend. and stores it in redis with the user id.
+    Stores the user's Spotify token in redis with the user id.
+
+    With the authorization ``code`` Spotify redirected to, the code is
+    exchanged for a full token that is then kept refreshed. A bare access
+    token sent by the frontend is accepted too but cannot be refreshed.
     """
     try:
-        if not authorization:
-            raise HTTPException(status_code=401, detail="No authorization header")
+        if code:
+            spotify_token = await auth.retrieve_token(code)
+        else:
+            if not authorization:
+                raise HTTPException(status_code=401, detail="No authorization header")
+
+            token = authorization.replace("Bearer ", "")
 
-        token = authorization.replace("Bearer ", "")
+            if not token:
+                raise HTTPException(status_code=401, detail="No token found")
+            spotify_token = SpotifyToken(access_token=token, token_type="Bearer")
 
-        if not token:
+        if not spotify_token.access_token:
             raise HTTPException(status_code=401, detail="No token found")
 
-        current_user = await UserManager(token).get_current_user()
+        current_user = await UserManager(
+            spotify_token.access_token, client, cache
+        ).get_current_user()
+        if not current_user.id:
+            raise HTTPException(status_code=502, detail="Spotify profile has no id")
 
-        redis.set_key(f"spotify_token:{current_user.id}", token)
+        await tokens.store(current_user.id, spotify_token)
 
         return {"status": "ok", "user": current_user}
 
-    except ValueError as err:
+    except HTTPException as he:
+        raise he
+
+    except (ValueError, SpotifyAuthenticationException) as err:
         raise HTTPException(status_code=401, detail=str(err))
 
+    except SpotifyRateLimitException as err:
+        raise rate_limited(err)
+
     except Exception as err:
         LOGGER.error(f"Error during Spotify callback: {err}")
         raise HTTPException(
@@ -70,15 +132,23 @@ async def spotify_callback(
 
 
 @spotify_router.get("/token", tags=["spotify"])
-def get_token(user_id: str, redis: Annotated[RedisConfig, Depends()]):
+async def get_token(
+    user_id: str,
+    tokens: Annotated[SpotifyTokenManager, Depends(get_token_manager)],
+):
+    """
+    Gets a valid access token of a user, refreshed first if about to expire.
+    """
     try:
-        token = redis.get_key(f"spotify_token:{user_id}")
-        if token:
-            return {"status": "ok", "token": token}
-
+        token = await tokens.get_valid_token(user_id)
+        return {"status": "ok", "token": token}
+    except SpotifyAuthenticationException as err:
         raise HTTPException(
-            status_code=401, detail="Token not found. Please authorize via /authorize."
+            status_code=401,
+            detail=f"Token not found or expired, authorize via /authorize: {err}",
         )
+    except SpotifyRateLimitException as err:
+        raise rate_limited(err)
     except Exception as err:
         raise HTTPException(
             status_code=500,
@@ -87,13 +157,19 @@ def get_token(user_id: str, redis: Annotated[RedisConfig, Depends()]):
 
 
 @spotify_router.get("/user", tags=["spotify"], status_code=200)
-async def get_current_user(token: str) -> SpotifyUser:
+async def get_current_user(
+    token: str,
+    client: Annotated[SpotifyClient, Depends(get_spotify_client)],
+    cache: Annotated[SpotifyProfileCache, Depends(get_profile_cache)],
+) -> SpotifyUser:
     """
     Gets the current user's information.
     """
     try:
-        user_manager = UserManager(token)
+        user_manager = UserManager(token, client, cache)
         return await user_manager.get_current_user()
+    except SpotifyRateLimitException as err:
+        raise rate_limited(err)
     except Exception as err:
         raise HTTPException(
             status_code=500,
@@ -102,15 +178,74 @@ async def get_current_user(token: str) -> SpotifyUser:
 
 
 @spotify_router.get("/user/{user_id}", tags=["spotify"], status_code=200)
-async def get_user(token: str, user_id: str) -> SpotifyUser:
+async def get_user(
+    token: str,
+    user_id: str,
+    client: Annotated[SpotifyClient, Depends(get_spotify_client)],
+    cache: Annotated[SpotifyProfileCache, Depends(get_profile_cache)],
+) -> SpotifyUser:
     """
     Gets a user's information.
     """
     try:
-        user_manager = UserManager(token)
+        user_manager = UserManager(token, client, cache)
         return await user_manager.get_user(user_id)
+    except SpotifyRateLimitException as err:
+        raise rate_limited(err)
     except Exception as err:
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error occurred while retrieving user: {err}",
         )
+
+
+@spotify_router.get("/users", tags=["spotify"], status_code=200)
+async def get_users(
+    token: str,
+    ids: str,
+    client: Annotated[SpotifyClient, Depends(get_spotify_client)],
+    cache: Annotated[SpotifyProfileCache, Depends(get_profile_cache)],
+) -> SpotifyUsersBatch:
+    """
+    Gets several users' information in one request.
+
+    Ids are comma separated. Profiles that could not be retrieved are listed
+    in ``errors`` instead of failing the whole request.
+    """
+    user_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="No user ids provided")
+    if len(user_ids) > GLOBAL_SETTINGS.SPOTIFY_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {GLOBAL_SETTINGS.SPOTIFY_BATCH_MAX_IDS} ids per request",
+        )
+
+    try:
+        user_manager = UserManager(token, client, cache)
+        return await user_manager.get_users(user_ids)
+    except Exception as err:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Unexpected error occurred while retrieving users: {err}",
+        )
+
+
+@spotify_router.get("/scheduler/stats", tags=["spotify"], status_code=200)
+def get_scheduler_stats(
+    scheduler: Annotated[SpotifyScheduler, Depends(get_spotify_scheduler)],
+) -> SchedulerStats:
+    """
+    Gets queue depth and wait-time statistics of the outbound Spotify scheduler.
+    """
+    return scheduler.stats()
+
+
+@spotify_router.get("/poller/stats", tags=["spotify"], status_code=200)
+def get_poller_stats(
+    poller: Annotated[PlaybackPoller, Depends(get_playback_poller)],
+) -> PollerStats:
+    """
+    Gets session and poll counters of the background playback poller.
+    """
+    return poller.stats()
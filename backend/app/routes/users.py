@@ -1,28 +1,58 @@
 from math import ceil
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from backend.app.config.database import get_db
+from backend.app.config.database import get_async_db
 from backend.app.config.logging import LOGGER
+from backend.app.models.tokens import Token
 from backend.app.models.users import (
+    FriendsBatch,
+    FriendsBatchResult,
+    FriendSuggestion,
+    MutualFriends,
+    OnlineUsers,
     PaginatedUsers,
-    User,
+    PresenceUpdate,
     UserCreate,
+    UserLogin,
     UserOut,
+    UserToken,
     UserUpdate,
 )
+from backend.app.repositories.cache import RepositoryCache, get_repository_cache
+from backend.app.repositories.token_repository import TokenRepository
 from backend.app.repositories.user_repository import UserRepository
+from backend.app.services.users.authenticator import (
+    Authenticator,
+    get_authenticator,
+    get_bearer_token,
+    get_current_user_id,
+)
+from backend.app.services.users.friend_graph import FriendGraph, get_friend_graph
+from backend.app.services.users.password_hasher import (
+    PasswordHasher,
+    get_password_hasher,
+)
+from backend.app.services.users.presence import PresenceStore, get_presence_store
+from backend.app.settings import GLOBAL_SETTINGS
 from backend.app.utils.exceptions import (
     EmailAlreadyExistsError,
+    InvalidCursorError,
+    PasswordHashingOverloadedError,
     PasswordNotStrongEnoughError,
     UserAlreadyExistsError,
 )
+from backend.app.utils.pagination import decode_cursor, encode_cursor
+from backend.app.utils.redis.redis_config import RedisConfig, get_redis
+from backend.app.utils.responses import ModelResponse
 from backend.app.utils.validation.users import UserValidator
 
 users_router = APIRouter()
 
+USERS_TOTAL_ESTIMATE_KEY = "users:total_estimate"
+
 
 @users_router.get("/health-check", tags=["users"])
 def health_check() -> dict[str, str]:
@@ -31,8 +61,11 @@ def health_check() -> dict[str, str]:
 
 
 @users_router.post("/", tags=["users"], status_code=201, response_model=UserOut)
-def create_user(
-    user_data: UserCreate, db: Annotated[Session, Depends(get_db)]
+async def create_user(
+    user_data: UserCreate,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    hasher: Annotated[PasswordHasher, Depends(get_password_hasher)],
 ) -> UserOut:
     """
     Creates a new user.
@@ -40,6 +73,8 @@ def create_user(
     Args:
         user_data: User creation data
         db: Database session
+        cache: Repository cache
+        hasher: Password hashing service
 
     Returns:
         UserOut: Created user data
@@ -49,17 +84,14 @@ def create_user(
     """
     LOGGER.error(f"Creating user with data: {user_data}")
     try:
-        user_repository = UserRepository(db)
-
-        # Validate user data
-        user_validator = UserValidator(user_repository)
-        user_validator.validate(user_data)
+        user_repository = UserRepository(db, cache)
 
-        # Check if email exists
-        if user_repository.get_by_email(user_data.email):
-            raise HTTPException(status_code=400, detail="Email already registered")
+        # Validate user data, uniqueness is checked by the insert itself
+        UserValidator().validate(user_data)
 
-        user = user_repository.create(user_data.model_dump())
+        user_dict = user_data.model_dump(exclude={"password"})
+        user_dict["password_hash"] = await hasher.hash(user_data.password)
+        user = await user_repository.create(user_dict)
         return UserOut.from_user(user)
 
     except (
@@ -68,6 +100,8 @@ def create_user(
         PasswordNotStrongEnoughError,
     ) as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHashingOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -75,65 +109,230 @@ def create_user(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@users_router.post("/login", tags=["users"], response_model=UserToken)
+async def login(
+    credentials: UserLogin,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    hasher: Annotated[PasswordHasher, Depends(get_password_hasher)],
+    authenticator: Annotated[Authenticator, Depends(get_authenticator)],
+) -> UserToken:
+    """
+    Authenticates a user and issues a bearer token.
+
+    The previous token of the user is revoked.
+
+    Args:
+        credentials: User's email and password
+        db: Database session
+        hasher: Password hashing service
+        authenticator: Bearer token verifier
+
+    Returns:
+        UserToken: The bearer token and the authenticated user
+
+    Raises:
+        HTTPException: If the credentials are invalid or hashing is overloaded
+    """
+    try:
+        user = await UserRepository(db).get_by_email(credentials.email)
+        password_hash = user.password_hash if user else None
+        if not await hasher.verify(credentials.password, password_hash) or not user:
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+
+        token_repository = TokenRepository(db, authenticator)
+        token = await token_repository.update(
+            user.id,
+            {"token": Token.generate_bearer_token(user.id), "is_active": True},
+        )
+        if token is None:
+            token = await token_repository.create(user)
+
+        return UserToken(access_token=token.token, user=UserOut.from_user(user))
+    except PasswordHashingOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        LOGGER.error(f"Error logging in: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.post("/logout", tags=["users"], status_code=204)
+async def logout(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    token: Annotated[str, Depends(get_bearer_token)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    authenticator: Annotated[Authenticator, Depends(get_authenticator)],
+) -> None:
+    """
+    Revokes the bearer token of the request.
+
+    Args:
+        user_id: ID of the authenticated user
+        token: The bearer token
+        db: Database session
+        authenticator: Bearer token verifier
+    """
+    try:
+        await authenticator.revoke(token)
+        await TokenRepository(db, authenticator).deactivate(user_id)
+    except Exception as e:
+        LOGGER.error(f"Error logging out: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.get("/me", tags=["users"], response_model=UserOut)
+async def get_me(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+) -> ModelResponse:
+    """
+    Gets the authenticated user.
+
+    Args:
+        user_id: ID of the authenticated user
+        db: Database session
+        cache: Repository cache
+        presence: Presence store
+
+    Returns:
+        ModelResponse: User data
+
+    Raises:
+        HTTPException: If the user no longer exists
+    """
+    try:
+        user = await UserRepository(db, cache).get(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        (user_out,) = await presence.apply([UserOut.from_user(user)])
+        return ModelResponse(user_out)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        LOGGER.error(f"Error getting current user: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @users_router.get("/", tags=["users"], response_model=PaginatedUsers)
-def get_users(
-    db: Annotated[Session, Depends(get_db)],
-    page: int = 1,
-    per_page: int = 20,
-) -> PaginatedUsers:
+async def get_users(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    redis: Annotated[RedisConfig, Depends(get_redis)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+    page: Annotated[int, Query(ge=1)] = 1,
+    per_page: Annotated[int, Query(ge=1, le=GLOBAL_SETTINGS.USERS_PAGE_MAX)] = 20,
+    cursor: str | None = None,
+    estimate_total: bool = False,
+) -> ModelResponse:
     """
     Gets a paginated list of users.
 
+    Pages can be addressed by number or, cheaper for deep pages, by following
+    the ``next_cursor`` of the previous response.
+
     Args:
         db: Database session
-        page: Page number (starts at 1)
+        redis: Redis client
+        presence: Presence store
+        page: Page number (starts at 1), ignored when a cursor is given
         per_page: Items per page
+        cursor: Opaque cursor returned as ``next_cursor`` by a previous call
+        estimate_total: Return the planner's row estimate instead of counting
 
     Returns:
-        PaginatedUsers: List of users with pagination info
+        ModelResponse: List of users with pagination info
     """
     try:
         user_repository = UserRepository(db)
-        total = db.exec(select(func.count(User.id))).first()
-        users = user_repository.list(per_page, (page - 1) * per_page)
-
-        return PaginatedUsers(
-            total=total,
-            users=[
-                UserOut.from_user(user, include_friends_count=True) for user in users
-            ],
-            page=page,
-            per_page=per_page,
-            pages=ceil(total / per_page),
+        if cursor is not None:
+            rows = await user_repository.list_with_friends_count(
+                per_page + 1, after=decode_cursor(cursor)
+            )
+        else:
+            rows = await user_repository.list_with_friends_count(
+                per_page + 1, (page - 1) * per_page
+            )
+
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            last_user = rows[-1][0]
+            next_cursor = encode_cursor(last_user.created_at, last_user.id)
+
+        total = await _count_users(user_repository, redis, estimate_total)
+        users = [UserOut.from_user(user, friends_count) for user, friends_count in rows]
+        # Users are instances of the field type, they are not validated again
+        return ModelResponse(
+            PaginatedUsers(
+                total=total,
+                total_is_estimate=estimate_total,
+                users=await presence.apply(users),
+                page=page if cursor is None else None,
+                per_page=per_page,
+                pages=ceil(total / per_page),
+                next_cursor=next_cursor,
+            )
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         LOGGER.error(f"Error getting users: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _count_users(
+    user_repository: UserRepository, redis: RedisConfig, estimate: bool
+) -> int:
+    """Counts users, or returns a Redis-cached estimate of the count."""
+    if not estimate:
+        return await user_repository.count()
+
+    total = await redis.get(USERS_TOTAL_ESTIMATE_KEY)
+    if total is None:
+        total = await user_repository.estimate_count()
+        await redis.set(
+            USERS_TOTAL_ESTIMATE_KEY,
+            total,
+            expire=GLOBAL_SETTINGS.USERS_TOTAL_ESTIMATE_TTL,
+        )
+    return total
+
+
 @users_router.get("/{username}", tags=["users"], response_model=UserOut)
-def get_user(username: str, db: Annotated[Session, Depends(get_db)]) -> UserOut:
+async def get_user(
+    username: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+) -> ModelResponse:
     """
     Gets a specific user by username.
 
     Args:
         username: User's display name
         db: Database session
+        cache: Repository cache
+        presence: Presence store
 
     Returns:
-        UserOut: User data
+        ModelResponse: User data
 
     Raises:
         HTTPException: If user not found
     """
     try:
-        user_repository = UserRepository(db)
-        user = user_repository.get_by_display_name(username)
+        user_repository = UserRepository(db, cache)
+        row = await user_repository.get_by_display_name_with_friends_count(username)
 
-        if not user:
+        if not row:
             raise HTTPException(status_code=404, detail="User not found")
 
-        return UserOut.from_user(user, include_friends_count=True)
+        user, friends_count = row
+        (user_out,) = await presence.apply([UserOut.from_user(user, friends_count)])
+        return ModelResponse(user_out)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -142,8 +341,12 @@ def get_user(username: str, db: Annotated[Session, Depends(get_db)]) -> UserOut:
 
 
 @users_router.patch("/{user_id}", tags=["users"], response_model=UserOut)
-def update_user(
-    user_id: str, user_data: UserUpdate, db: Annotated[Session, Depends(get_db)]
+async def update_user(
+    user_id: str,
+    user_data: UserUpdate,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    hasher: Annotated[PasswordHasher, Depends(get_password_hasher)],
 ) -> UserOut:
     """
     Updates an existing user.
@@ -152,29 +355,33 @@ def update_user(
         user_id: User's ID
         user_data: Update data
         db: Database session
+        cache: Repository cache
+        hasher: Password hashing service
 
     Returns:
         UserOut: Updated user data
 
     Raises:
-        HTTPException: If user not found or email exists
+        HTTPException: If user not found or email or display name is taken
     """
     try:
-        user_repository = UserRepository(db)
+        user_repository = UserRepository(db, cache)
 
-        # Check email uniqueness if provided
-        if user_data.email:
-            existing_user = user_repository.get_by_email(user_data.email)
-            if existing_user and existing_user.id != user_id:
-                raise HTTPException(status_code=400, detail="Email already in use")
+        update_dict = user_data.model_dump(exclude_unset=True)
+        if update_dict.get("password") is not None:
+            update_dict["password_hash"] = await hasher.hash(
+                update_dict.pop("password")
+            )
 
-        updated_user = user_repository.update(
-            user_id, user_data.model_dump(exclude_unset=True)
-        )
+        updated_user = await user_repository.update(user_id, update_dict)
         if not updated_user:
             raise HTTPException(status_code=404, detail="User not found")
 
         return UserOut.from_user(updated_user)
+    except (EmailAlreadyExistsError, UserAlreadyExistsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHashingOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -183,21 +390,35 @@ def update_user(
 
 
 @users_router.delete("/{user_id}", status_code=204)
-def delete_user(user_id: str, db: Annotated[Session, Depends(get_db)]) -> None:
+async def delete_user(
+    user_id: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
+    authenticator: Annotated[Authenticator, Depends(get_authenticator)],
+) -> None:
     """
-    Deletes an existing user.
+    Deletes an existing user and revokes their bearer token.
 
     Args:
         user_id: User's ID
         db: Database session
+        cache: Repository cache
+        graph: Friend graph index
+        authenticator: Bearer token verifier
 
     Raises:
         HTTPException: If user not found
     """
     try:
-        user_repository = UserRepository(db)
-        if not user_repository.delete(user_id):
+        user_repository = UserRepository(db, cache)
+        friended_by = await user_repository.get_friended_by_ids(user_id)
+        token = await TokenRepository(db).get(user_id)
+        if not await user_repository.delete(user_id):
             raise HTTPException(status_code=404, detail="User not found")
+        await graph.invalidate(user_id, *friended_by)
+        if token is not None:
+            await authenticator.revoke(token.token)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -206,8 +427,12 @@ def delete_user(user_id: str, db: Annotated[Session, Depends(get_db)]) -> None:
 
 
 @users_router.post("/{user_id}/friends/{friend_id}", status_code=204)
-def add_friend(
-    user_id: str, friend_id: str, db: Annotated[Session, Depends(get_db)]
+async def add_friend(
+    user_id: str,
+    friend_id: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
 ) -> None:
     """
     Adds a friend relationship between users.
@@ -216,6 +441,8 @@ def add_friend(
         user_id: User's ID
         friend_id: Friend's ID
         db: Database session
+        cache: Repository cache
+        graph: Friend graph index
 
     Raises:
         HTTPException: If users not found or invalid request
@@ -224,9 +451,10 @@ def add_friend(
         if user_id == friend_id:
             raise HTTPException(status_code=400, detail="Cannot add yourself as friend")
 
-        user_repository = UserRepository(db)
-        if not user_repository.add_friend(user_id, friend_id):
+        user_repository = UserRepository(db, cache)
+        if not await user_repository.add_friend(user_id, friend_id):
             raise HTTPException(status_code=404, detail="User or friend not found")
+        await graph.add_friends(user_id, [friend_id])
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -235,8 +463,12 @@ def add_friend(
 
 
 @users_router.delete("/{user_id}/friends/{friend_id}", status_code=204)
-def remove_friend(
-    user_id: str, friend_id: str, db: Annotated[Session, Depends(get_db)]
+async def remove_friend(
+    user_id: str,
+    friend_id: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
 ) -> None:
     """
     Removes a friend relationship between users.
@@ -245,16 +477,245 @@ def remove_friend(
         user_id: User's ID
         friend_id: Friend's ID
         db: Database session
+        cache: Repository cache
+        graph: Friend graph index
 
     Raises:
         HTTPException: If users not found
     """
     try:
-        user_repository = UserRepository(db)
-        if not user_repository.remove_friend(user_id, friend_id):
+        user_repository = UserRepository(db, cache)
+        if not await user_repository.remove_friend(user_id, friend_id):
             raise HTTPException(status_code=404, detail="User or friend not found")
+        await graph.remove_friends(user_id, [friend_id])
     except HTTPException as he:
         raise he
     except Exception as e:
         LOGGER.error(f"Error removing friend: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.post(
+    "/{user_id}/friends:batch", tags=["users"], response_model=FriendsBatchResult
+)
+async def update_friends(
+    user_id: str,
+    batch: FriendsBatch,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
+) -> FriendsBatchResult:
+    """
+    Adds and removes many friends of a user at once.
+
+    Args:
+        user_id: User's ID
+        batch: IDs of the friends to add and to remove
+        db: Database session
+        cache: Repository cache
+        graph: Friend graph index
+
+    Returns:
+        FriendsBatchResult: IDs actually added and removed
+
+    Raises:
+        HTTPException: If the batch is too large or the user is not found
+    """
+    try:
+        if len(batch.add) + len(batch.remove) > GLOBAL_SETTINGS.FRIENDS_BATCH_MAX_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {GLOBAL_SETTINGS.FRIENDS_BATCH_MAX_IDS} ids per batch",
+            )
+
+        user_repository = UserRepository(db, cache)
+        added, removed = await user_repository.update_friends(
+            user_id, batch.add, batch.remove
+        )
+        # An empty result is ambiguous, only then check the user exists
+        if not added and not removed and not await user_repository.get(user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        await graph.add_friends(user_id, added)
+        await graph.remove_friends(user_id, removed)
+        return FriendsBatchResult(added=added, removed=removed)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        LOGGER.error(f"Error updating friends: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.get(
+    "/{user_id}/friends/mutual/{other_id}",
+    tags=["users"],
+    response_model=MutualFriends,
+)
+async def get_mutual_friends(
+    user_id: str,
+    other_id: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+    limit: Annotated[int, Query(ge=1, le=GLOBAL_SETTINGS.MUTUAL_FRIENDS_MAX)] = 50,
+) -> MutualFriends:
+    """
+    Gets the friends two users have in common.
+
+    Args:
+        user_id: User's ID
+        other_id: Other user's ID
+        db: Database session
+        graph: Friend graph index
+        presence: Presence store
+        limit: Maximum number of users returned
+
+    Returns:
+        MutualFriends: Number of mutual friends and the first of them
+
+    Raises:
+        HTTPException: If either user is not found
+    """
+    try:
+        user_repository = UserRepository(db)
+        if len(await user_repository.get_many([user_id, other_id])) < len(
+            {user_id, other_id}
+        ):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        mutual_ids = await graph.mutual_friends(user_id, other_id)
+        users = await user_repository.get_many(mutual_ids[:limit])
+        users_out = [
+            UserOut.from_user(user) for user in sorted(users, key=lambda user: user.id)
+        ]
+        return MutualFriends(
+            total=len(mutual_ids), users=await presence.apply(users_out)
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        LOGGER.error(f"Error getting mutual friends: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.get(
+    "/{user_id}/suggestions",
+    tags=["users"],
+    response_model=list[FriendSuggestion],
+)
+async def get_friend_suggestions(
+    user_id: str,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    cache: Annotated[RepositoryCache, Depends(get_repository_cache)],
+    graph: Annotated[FriendGraph, Depends(get_friend_graph)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+    limit: Annotated[int, Query(ge=1, le=GLOBAL_SETTINGS.FRIEND_SUGGESTIONS_MAX)] = 20,
+) -> list[FriendSuggestion]:
+    """
+    Suggests friends of friends, ranked by the number of shared friends.
+
+    Args:
+        user_id: User's ID
+        db: Database session
+        cache: Repository cache
+        graph: Friend graph index
+        presence: Presence store
+        limit: Maximum number of suggestions
+
+    Returns:
+        list[FriendSuggestion]: Suggested users, best first
+
+    Raises:
+        HTTPException: If the user is not found
+    """
+    try:
+        user_repository = UserRepository(db, cache)
+        if not await user_repository.get(user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        ranked = await graph.suggestions(user_id, limit)
+        users = {
+            user.id: UserOut.from_user(user)
+            for user in await user_repository.get_many([id for id, _ in ranked])
+        }
+        await presence.apply(list(users.values()))
+        return [
+            FriendSuggestion(user=users[id], mutual_friends=count)
+            for id, count in ranked
+            if id in users
+        ]
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        LOGGER.error(f"Error getting friend suggestions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.get("/presence/online", tags=["users"], response_model=OnlineUsers)
+async def get_online_users(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+    limit: Annotated[int, Query(ge=1, le=GLOBAL_SETTINGS.PRESENCE_ONLINE_MAX)] = 50,
+) -> OnlineUsers:
+    """
+    Gets the users currently online, most recently active first.
+
+    Args:
+        db: Database session
+        presence: Presence store
+        limit: Maximum number of users returned
+
+    Returns:
+        OnlineUsers: Number of online users and the first of them
+    """
+    try:
+        total, user_ids = await presence.online(limit)
+        users = {
+            user.id: UserOut.from_user(user)
+            for user in await UserRepository(db).get_many(user_ids)
+        }
+        ordered = [users[user_id] for user_id in user_ids if user_id in users]
+        return OnlineUsers(total=total, users=await presence.apply(ordered))
+    except Exception as e:
+        LOGGER.error(f"Error getting online users: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.put("/{user_id}/presence", tags=["users"], status_code=204)
+async def update_presence(
+    user_id: str,
+    presence_data: PresenceUpdate,
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+) -> None:
+    """
+    Records a presence heartbeat, keeping the user online.
+
+    Args:
+        user_id: User's ID
+        presence_data: What the user is currently playing
+        presence: Presence store
+    """
+    try:
+        await presence.heartbeat(user_id, presence_data.currently_playing)
+    except Exception as e:
+        LOGGER.error(f"Error updating presence: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@users_router.delete("/{user_id}/presence", tags=["users"], status_code=204)
+async def clear_presence(
+    user_id: str,
+    presence: Annotated[PresenceStore, Depends(get_presence_store)],
+) -> None:
+    """
+    Marks a user offline.
+
+    Args:
+        user_id: User's ID
+        presence: Presence store
+    """
+    try:
+        await presence.set_offline(user_id)
+    except Exception as e:
+        LOGGER.error(f"Error clearing presence: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
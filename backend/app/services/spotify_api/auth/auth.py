@@ -1,13 +1,15 @@
 import httpx
 from urllib.parse import urlencode
 
+from backend.app.services.spotify_api.client import SpotifyClient
 from backend.app.services.spotify_api.exceptions import SpotifyAuthenticationException
 from backend.app.services.spotify_api.schemas.token import SpotifyToken
 from backend.app.settings import GLOBAL_SETTINGS
 
 
 class SpotifyAuth:
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(self, client_id: str, client_secret: str, client: SpotifyClient):
+        self.client = client
         self.client_id = client_id
         self.client_secret = client_secret
         self.token: SpotifyToken | None = None
@@ -28,7 +30,7 @@ class SpotifyAuth:
         }
         return f"{self.authorization_url}?{urlencode(params)}"
 
-    def retrieve_token(self, authorization_code: str) -> SpotifyToken:
+    async def retrieve_token(self, authorization_code: str) -> SpotifyToken:
         """
         Extracts the access token from the authorization code.
         """
@@ -44,7 +46,12 @@ class SpotifyAuth:
             "client_secret": self.client_secret,
         }
         try:
-            response = httpx.post(self.token_url, data=data, headers=headers)
+            response = await self.client.post(
+                self.token_url,
+                data=data,
+                headers=headers,
+                scheduling_key="accounts",
+            )
             response.raise_for_status()
             response_data = response.json()
 
@@ -55,21 +62,30 @@ class SpotifyAuth:
         except httpx.RequestError as err:
             raise SpotifyAuthenticationException(f"Failed to retrieve token: {err}")
 
-    def refresh_token(self) -> SpotifyToken:
+    async def refresh_token(self, refresh_token: str | None = None) -> SpotifyToken:
         """
         Updates the access token using the refresh token.
+
+        Args:
+            refresh_token: Refresh token to use, defaults to the one of the
+                current token
         """
         headers = {
             "Content-Type": "application/x-www-form-urlencoded",
         }
         data = {
             "grant_type": "refresh_token",
-            "refresh_token": self.token.refresh_token,
+            "refresh_token": refresh_token or self.token.refresh_token,
             "client_id": self.client_id,
             "client_secret": self.client_secret,
         }
         try:
-            response = httpx.post(self.token_url, data=data, headers=headers)
+            response = await self.client.post(
+                self.token_url,
+                data=data,
+                headers=headers,
+                scheduling_key="accounts",
+            )
             response.raise_for_status()
             response_data = response.json()
 
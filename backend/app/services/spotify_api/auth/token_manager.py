@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from fastapi import Request
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from backend.app.services.spotify_api.auth.auth import SpotifyAuth
+from backend.app.services.spotify_api.exceptions import SpotifyAuthenticationException
+from backend.app.services.spotify_api.schemas.token import SpotifyToken
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.cache.lru import TTLCache
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "spotify_token:"
+EXPIRY_KEY = "spotify_token_expiry"
+
+# Lifetime assumed when Spotify does not send expires_in
+DEFAULT_EXPIRES_IN = 3600
+
+# Below this many seconds of validity a token is refreshed before being
+# handed out, the background refresher normally gets there first.
+MIN_VALIDITY = 60
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SpotifyTokenManager:
+    """
+    Keeps the Spotify tokens of every user valid.
+
+    - Each token is stored whole, refresh token included, in a
+      ``spotify_token:{spotify_id}`` key expiring with the access token.
+    - ``spotify_token_expiry`` is a sorted set of users scored by the expiry
+      of their token, a background task refreshes the tokens expiring within
+      ``refresh_margin`` seconds so callers never hit an expired one.
+    - Refreshes take a per-user Redis lock, so a single refresh runs across
+      workers, and concurrent callers in a worker share it.
+    - Valid access tokens are also kept in process for ``local_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        auth: SpotifyAuth,
+        refresh_margin: int = GLOBAL_SETTINGS.SPOTIFY_TOKEN_REFRESH_MARGIN,
+        refresh_interval: float = GLOBAL_SETTINGS.SPOTIFY_TOKEN_REFRESH_INTERVAL,
+        refresh_concurrency: int = GLOBAL_SETTINGS.SPOTIFY_TOKEN_REFRESH_CONCURRENCY,
+        lock_ttl_ms: int = GLOBAL_SETTINGS.SPOTIFY_TOKEN_LOCK_MS,
+        local_ttl: float = GLOBAL_SETTINGS.SPOTIFY_TOKEN_LOCAL_TTL,
+        poll_interval: float = 0.05,
+    ):
+        self.redis = redis
+        self.auth = auth
+        self.refresh_margin = refresh_margin
+        self.refresh_interval = refresh_interval
+        self.refresh_concurrency = refresh_concurrency
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_interval = poll_interval
+        self.refreshed = 0
+        self._release_lock = redis.connection.register_script(RELEASE_LOCK_SCRIPT)
+        self._local: TTLCache[SpotifyToken] = TTLCache(
+            GLOBAL_SETTINGS.SPOTIFY_TOKEN_LOCAL_MAX_ENTRIES, local_ttl
+        )
+        self._refreshing: dict[str, asyncio.Future] = {}
+        self._refresher: asyncio.Task | None = None
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return TOKEN_PREFIX + user_id
+
+    @staticmethod
+    def _lock_key(user_id: str) -> str:
+        return f"spotify_token_lock:{user_id}"
+
+    async def start(self) -> None:
+        """Starts the background refresher."""
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+            logger.info("Spotify token refresher started.")
+
+    async def stop(self) -> None:
+        """Stops the background refresher."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+            logger.info("Spotify token refresher stopped.")
+
+    async def store(self, user_id: str, token: SpotifyToken) -> SpotifyToken:
+        """
+        Stores a user's token until its access token expires.
+
+        Args:
+            user_id: The user's Spotify ID
+            token: Token as returned by Spotify
+
+        Returns:
+            SpotifyToken: The stored token, with ``expires_at`` set
+        """
+        expires_in = token.expires_in or DEFAULT_EXPIRES_IN
+        expires_at = time.time() + expires_in
+        token = token.model_copy(
+            update={"expires_in": expires_in, "expires_at": expires_at}
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(user_id), token.model_dump_json(), ex=expires_in)
+            pipe.zadd(EXPIRY_KEY, {user_id: expires_at})
+        self._local.set(user_id, token)
+        return token
+
+    @staticmethod
+    def _decode(user_id: str, value: str | None) -> SpotifyToken | None:
+        if not value:
+            return None
+        try:
+            return SpotifyToken.model_validate_json(value)
+        except ValidationError:
+            # Written before tokens were stored whole, the user authorizes again
+            logger.warning(f"Ignoring unreadable Spotify token of {user_id}")
+            return None
+
+    async def get(self, user_id: str) -> SpotifyToken | None:
+        """Returns a user's stored token, whether or not it is about to expire."""
+        value = await self.redis.connection.get(self._key(user_id))
+        return self._decode(user_id, value)
+
+    async def get_many(self, user_ids: list[str]) -> dict[str, SpotifyToken]:
+        """
+        Reads the stored tokens of many users in one round trip.
+
+        Returns:
+            dict[str, SpotifyToken]: Token by Spotify id, unknown users omitted
+        """
+        if not user_ids:
+            return {}
+        values = await self.redis.connection.mget(
+            [self._key(user_id) for user_id in user_ids]
+        )
+        tokens = {
+            user_id: self._decode(user_id, value)
+            for user_id, value in zip(user_ids, values, strict=True)
+        }
+        return {user_id: token for user_id, token in tokens.items() if token}
+
+    async def active(self) -> list[str]:
+        """Returns the Spotify ids of the users holding an unexpired token."""
+        return await self.redis.connection.zrangebyscore(
+            EXPIRY_KEY, time.time(), "+inf"
+        )
+
+    async def get_valid_token(self, user_id: str) -> str:
+        """
+        Returns an access token of a user valid for at least a minute.
+
+        A token without a refresh token, as sent by the frontend, cannot be
+        refreshed and is returned until it expires.
+
+        Args:
+            user_id: The user's Spotify ID
+
+        Returns:
+            str: The access token
+
+        Raises:
+            SpotifyAuthenticationException: If the user has no token, or it
+                expires and cannot be refreshed
+        """
+        token = self._local.get(user_id)
+        if token is None or not self._is_valid(token, MIN_VALIDITY):
+            token = await self.get(user_id)
+            if token is None:
+                raise SpotifyAuthenticationException(
+                    "No Spotify session, authorize via /spotify/authorize"
+                )
+            if not self._is_valid(token, MIN_VALIDITY):
+                if token.refresh_token:
+                    token = await self.refresh(user_id)
+                elif not self._is_valid(token, 0):
+                    raise SpotifyAuthenticationException(
+                        f"Spotify token of {user_id} expired and cannot be refreshed"
+                    )
+            self._local.set(user_id, token)
+        if token.access_token is None:
+            raise SpotifyAuthenticationException(
+                f"Spotify token of {user_id} has no access token"
+            )
+        return token.access_token
+
+    async def refresh(self, user_id: str) -> SpotifyToken:
+        """
+        Refreshes a user's token unless another caller just did.
+
+        Concurrent calls in this worker share one refresh, and calls from
+        other workers wait for the one holding the user's lock.
+
+        Raises:
+            SpotifyAuthenticationException: If the token cannot be refreshed
+        """
+        flight = self._refreshing.get(user_id)
+        if flight is not None:
+            return await asyncio.shield(flight)
+
+        flight = asyncio.get_running_loop().create_future()
+        self._refreshing[user_id] = flight
+        try:
+            token = await self._refresh_locked(user_id)
+            flight.set_result(token)
+            return token
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Waiters get the error, mark it as retrieved when there are none
+            flight.exception()
+            raise
+        finally:
+            del self._refreshing[user_id]
+
+    async def invalidate(self, user_id: str) -> None:
+        """Forgets a user's token."""
+        self._local.delete(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(user_id))
+            pipe.zrem(EXPIRY_KEY, user_id)
+
+    def _is_valid(self, token: SpotifyToken, min_validity: float) -> bool:
+        return (
+            token.access_token is not None
+            and token.expires_at is not None
+            and token.expires_at - time.time() > min_validity
+        )
+
+    async def _refresh_locked(self, user_id: str) -> SpotifyToken:
+        connection = self.redis.connection
+        lock_key = self._lock_key(user_id)
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        while not await connection.set(lock_key, owner, nx=True, px=self.lock_ttl_ms):
+            # Another worker is refreshing, its token is used once stored
+            if time.monotonic() > deadline:
+                raise SpotifyAuthenticationException(
+                    f"Timed out waiting for the token refresh of {user_id}"
+                )
+            await asyncio.sleep(self.poll_interval)
+            token = await self.get(user_id)
+            if token is not None and self._is_valid(token, self.refresh_margin):
+                return token
+
+        try:
+            # The token may have been refreshed between the check and the lock
+            token = await self.get(user_id)
+            if token is None:
+                await connection.zrem(EXPIRY_KEY, user_id)
+                raise SpotifyAuthenticationException(f"No Spotify token for {user_id}")
+            if self._is_valid(token, self.refresh_margin):
+                return token
+            if not token.refresh_token:
+                raise SpotifyAuthenticationException(
+                    f"Spotify token of {user_id} cannot be refreshed"
+                )
+
+            refreshed = await self.auth.refresh_token(token.refresh_token)
+            if not refreshed.refresh_token:
+                # Spotify only sends a refresh token when it rotates it
+                refreshed.refresh_token = token.refresh_token
+            self.refreshed += 1
+            return await self.store(user_id, refreshed)
+        finally:
+            try:
+                await self._release_lock(keys=[lock_key], args=[owner])
+            except RedisError as e:
+                logger.error(f"Error releasing token lock of {user_id}: {e}")
+
+    async def refresh_expiring(self) -> int:
+        """
+        Refreshes every token expiring within ``refresh_margin`` seconds.
+
+        Returns:
+            int: Number of tokens refreshed
+        """
+        now = time.time()
+        connection = self.redis.connection
+        await connection.zremrangebyscore(EXPIRY_KEY, "-inf", now)
+        user_ids = await connection.zrangebyscore(
+            EXPIRY_KEY, now, now + self.refresh_margin
+        )
+        semaphore = asyncio.Semaphore(self.refresh_concurrency)
+
+        async def refresh(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    await self.refresh(user_id)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Could not refresh Spotify token: {e}")
+                    return False
+
+        results = await asyncio.gather(*(refresh(user_id) for user_id in user_ids))
+        return sum(results)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh_expiring()
+            except Exception as e:
+                logger.error(f"Error refreshing Spotify tokens: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+def get_token_manager(request: Request) -> SpotifyTokenManager:
+    """
+    Provides the token manager created in the application lifespan.
+
+    Returns:
+        SpotifyTokenManager: The process-wide Spotify token manager
+    """
+    return request.app.state.spotify_tokens
@@ -0,0 +1,120 @@
+import logging
+from typing import Any
+
+import httpx
+from fastapi import Request
+
+from backend.app.services.spotify_api.scheduler import SpotifyScheduler
+from backend.app.services.spotify_api.single_flight import SingleFlight
+from backend.app.settings import GLOBAL_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class SpotifyClient:
+    """
+    Process-wide HTTP client shared by every Spotify service class.
+
+    Wraps a single pooled ``httpx.AsyncClient`` so that connections to the
+    Spotify API and accounts service are kept alive and reused across requests.
+    When a scheduler is given, every request goes through it, and when a
+    single-flight group is given, identical concurrent GETs are coalesced.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        scheduler: SpotifyScheduler | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
+        self.http_client = http_client
+        self.scheduler = scheduler
+        self.single_flight = single_flight
+
+    @classmethod
+    def from_settings(
+        cls,
+        scheduler: SpotifyScheduler | None = None,
+        single_flight: SingleFlight | None = None,
+    ) -> "SpotifyClient":
+        """Builds a client configured from the global settings."""
+        limits = httpx.Limits(
+            max_connections=GLOBAL_SETTINGS.SPOTIFY_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=GLOBAL_SETTINGS.SPOTIFY_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=GLOBAL_SETTINGS.SPOTIFY_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            GLOBAL_SETTINGS.SPOTIFY_HTTP_TIMEOUT,
+            connect=GLOBAL_SETTINGS.SPOTIFY_HTTP_CONNECT_TIMEOUT,
+            pool=GLOBAL_SETTINGS.SPOTIFY_HTTP_POOL_TIMEOUT,
+        )
+        http_client = httpx.AsyncClient(
+            http2=GLOBAL_SETTINGS.SPOTIFY_HTTP2,
+            limits=limits,
+            timeout=timeout,
+        )
+        logger.info("Spotify HTTP client created.")
+        return cls(http_client, scheduler, single_flight)
+
+    async def close(self) -> None:
+        """Closes every pooled connection."""
+        await self.http_client.aclose()
+        logger.info("Spotify HTTP client closed.")
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        scheduling_key: str = "anonymous",
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Sends a request through the scheduler and the shared connection pool.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            scheduling_key: Fairness key of the caller, usually one per user
+            **kwargs: Passed through to ``httpx.AsyncClient.request``
+        """
+        if self.scheduler is None:
+            return await self.http_client.request(method, url, **kwargs)
+
+        return await self.scheduler.submit(
+            lambda: self.http_client.request(method, url, **kwargs),
+            key=scheduling_key,
+        )
+
+    async def get(
+        self, url: str, coalesce_scope: str | None = None, **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Sends a GET request.
+
+        Args:
+            url: Absolute URL
+            coalesce_scope: Token scope of the call, concurrent calls with the
+                same URL, params and scope share one request. None disables
+                coalescing.
+            **kwargs: Passed through to ``request``
+        """
+        if self.single_flight is None or coalesce_scope is None:
+            return await self.request("GET", url, **kwargs)
+
+        key = SingleFlight.make_key("GET", url, kwargs.get("params"), coalesce_scope)
+        return await self.single_flight.do(
+            key, lambda: self.request("GET", url, **kwargs), url
+        )
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+def get_spotify_client(request: Request) -> SpotifyClient:
+    """
+    Provides the Spotify client created in the application lifespan.
+
+    Returns:
+        SpotifyClient: The process-wide Spotify client
+    """
+    return request.app.state.spotify_client
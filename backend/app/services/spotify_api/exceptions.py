@@ -8,3 +8,9 @@ class SpotifyAuthenticationException(SpotifyBaseException):
 
 class SpotifyAPIException(SpotifyBaseException):
     pass
+
+
+class SpotifyRateLimitException(SpotifyAPIException):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
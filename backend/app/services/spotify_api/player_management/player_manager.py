@@ -0,0 +1,84 @@
+import hashlib
+import logging
+
+import httpx
+
+from backend.app.services.spotify_api.client import SpotifyClient
+from backend.app.services.spotify_api.exceptions import (
+    SpotifyAPIException,
+    SpotifyAuthenticationException,
+    SpotifyRateLimitException,
+)
+from backend.app.services.spotify_api.schemas.decoding import decode
+from backend.app.services.spotify_api.schemas.player import CurrentlyPlaying
+from backend.app.services.spotify_api.schemas.projection import Projection
+from backend.app.services.spotify_api.user_management.user_manager import UserManager
+from backend.app.settings import GLOBAL_SETTINGS
+
+logger = logging.getLogger("PLAYER MANAGER")
+
+
+class PlayerManager:
+    def __init__(self, token: str, client: SpotifyClient):
+        self.token = token
+        self.client = client
+        self.scheduling_key = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+        self.player_url = GLOBAL_SETTINGS.SPOTIFY_BASE_URL + "v1/me/player/"
+
+    async def get_currently_playing(
+        self,
+        projection: Projection[CurrentlyPlaying] | None = None,
+        market: str | None = GLOBAL_SETTINGS.SPOTIFY_MARKET,
+    ) -> CurrentlyPlaying | None:
+        """
+        Gets what the user is currently playing.
+
+        Args:
+            projection: Fields the caller reads, only those are requested
+                and decoded. Defaults to the full object.
+            market: Market tracks are relinked to, Spotify then leaves
+                ``available_markets`` out of the response
+
+        Returns:
+            CurrentlyPlaying | None: The playback state, None if nothing plays
+
+        Raises:
+            SpotifyAuthenticationException: If the token is invalid or expired
+            SpotifyRateLimitException: If Spotify rate limited the call
+            SpotifyAPIException: For any other failure
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.token}",
+        }
+        params = {}
+        if market:
+            params["market"] = market
+        if projection is not None:
+            params["fields"] = projection.fields
+        try:
+            response = await self.client.get(
+                self.player_url + "currently-playing",
+                params=params,
+                headers=headers,
+                scheduling_key=self.scheduling_key,
+                coalesce_scope=self.scheduling_key,
+            )
+            if response.status_code == 204:
+                return None
+            response.raise_for_status()
+            model = projection.model if projection else CurrentlyPlaying
+            return decode(model, response.content)
+        except SpotifyRateLimitException:
+            raise
+        except httpx.HTTPStatusError as err:
+            if err.response.status_code == 401:
+                raise SpotifyAuthenticationException(
+                    f"Spotify token rejected: {err}"
+                ) from err
+            UserManager._raise_if_rate_limited(err)
+            raise SpotifyAPIException(f"Failed to get currently playing: {err}")
+        except httpx.RequestError as err:
+            raise SpotifyAPIException(f"Failed to get currently playing: {err}")
+        except Exception as err:
+            raise SpotifyAPIException(f"Failed to get currently playing: {err}")
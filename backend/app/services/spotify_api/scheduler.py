@@ -0,0 +1,314 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi import Request
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from backend.app.services.spotify_api.exceptions import SpotifyRateLimitException
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "spotify_rate_limit:bucket"
+PAUSE_KEY = "spotify_rate_limit:paused"
+
+# Shared token bucket. Returns 0 when a token was taken, otherwise the number
+# of milliseconds to wait. Time comes from the Redis server so every worker
+# refills the bucket against the same clock.
+TOKEN_BUCKET_SCRIPT = """
+local paused = redis.call('PTTL', KEYS[2])
+if paused > 0 then
+    return paused
+end
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local rate = tonumber(ARGV[1]) / 1000
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now_ms
+tokens = math.min(burst, tokens + math.max(0, now_ms - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now_ms))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate) + 1000)
+return wait
+"""
+
+
+class SchedulerStats(BaseModel):
+    """Snapshot of the outbound Spotify scheduler"""
+
+    queue_depth: int
+    queue_depth_by_key: dict[str, int]
+    in_flight: int
+    dispatched: int
+    rate_limited: int
+    paused_for: float
+    wait_time_avg: float
+    wait_time_p95: float
+    wait_time_max: float
+
+
+@dataclass(order=True)
+class _QueuedCall:
+    finish_tag: float
+    sequence: int
+    key: str = field(compare=False)
+    call: Callable[[], Awaitable[httpx.Response]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class SpotifyScheduler:
+    """
+    Outbound scheduler every Spotify call goes through.
+
+    - A token bucket stored in Redis caps the request rate of the whole
+      cluster, falling back to a local bucket if Redis is unavailable.
+    - A 429 response pauses every worker for its ``Retry-After`` delay, and
+      the call is queued again instead of failing.
+    - Calls are dispatched by weighted fair queuing on a per-key basis
+      (usually one key per user), so a single heavy user cannot starve others.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        rate: float = GLOBAL_SETTINGS.SPOTIFY_RATE_LIMIT_PER_SECOND,
+        burst: int = GLOBAL_SETTINGS.SPOTIFY_RATE_LIMIT_BURST,
+        max_queue: int = GLOBAL_SETTINGS.SPOTIFY_SCHEDULER_MAX_QUEUE,
+        max_in_flight: int = GLOBAL_SETTINGS.SPOTIFY_SCHEDULER_MAX_IN_FLIGHT,
+        max_retries: int = GLOBAL_SETTINGS.SPOTIFY_SCHEDULER_MAX_RETRIES,
+    ):
+        self.redis = redis
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self._bucket = redis.connection.register_script(TOKEN_BUCKET_SCRIPT)
+        self._heap: list[_QueuedCall] = []
+        self._sequence = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._running = 0
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        self._depth: dict[str, int] = {}
+        self._paused_until = 0.0
+        self._local_tokens = float(burst)
+        self._local_refilled_at = time.monotonic()
+        self._wait_times: deque[float] = deque(maxlen=1000)
+        self._dispatched = 0
+        self._rate_limited = 0
+        self._dispatcher: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Starts the dispatcher task."""
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+            logger.info("Spotify scheduler started.")
+
+    async def stop(self) -> None:
+        """Stops the dispatcher and fails every queued call."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if not item.future.done():
+                item.future.set_exception(
+                    SpotifyRateLimitException("Spotify scheduler stopped")
+                )
+        self._depth.clear()
+        logger.info("Spotify scheduler stopped.")
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[httpx.Response]],
+        key: str = "anonymous",
+        weight: float = 1.0,
+    ) -> httpx.Response:
+        """
+        Queues a call and waits for its response.
+
+        Args:
+            call: Coroutine factory performing the HTTP request
+            key: Fairness key, calls sharing a key share one fair share
+            weight: Relative share of the key, higher means served more often
+
+        Returns:
+            httpx.Response: The response, a 429 once retries are exhausted
+
+        Raises:
+            SpotifyRateLimitException: If the queue is full
+        """
+        if len(self._heap) >= self.max_queue:
+            raise SpotifyRateLimitException(
+                "Spotify request queue is full", retry_after=1.0
+            )
+
+        start = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        finish_tag = start + 1.0 / weight
+        self._last_finish[key] = finish_tag
+
+        item = _QueuedCall(
+            finish_tag=finish_tag,
+            sequence=next(self._sequence),
+            key=key,
+            call=call,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic(),
+        )
+        self._push(item)
+        return await item.future
+
+    def stats(self) -> SchedulerStats:
+        """Returns queue depth and wait-time statistics."""
+        waits = sorted(self._wait_times)
+        return SchedulerStats(
+            queue_depth=len(self._heap),
+            queue_depth_by_key={k: v for k, v in self._depth.items() if v},
+            in_flight=self._running,
+            dispatched=self._dispatched,
+            rate_limited=self._rate_limited,
+            paused_for=max(self._paused_until - time.monotonic(), 0.0),
+            wait_time_avg=sum(waits) / len(waits) if waits else 0.0,
+            wait_time_p95=waits[int(len(waits) * 0.95)] if waits else 0.0,
+            wait_time_max=waits[-1] if waits else 0.0,
+        )
+
+    def _push(self, item: _QueuedCall) -> None:
+        heapq.heappush(self._heap, item)
+        self._depth[item.key] = self._depth.get(item.key, 0) + 1
+        self._not_empty.set()
+
+    def _pop(self) -> _QueuedCall:
+        item = heapq.heappop(self._heap)
+        self._virtual_time = max(self._virtual_time, item.finish_tag)
+        self._depth[item.key] -= 1
+        if not self._depth[item.key]:
+            del self._depth[item.key]
+            if self._last_finish.get(item.key, 0.0) <= self._virtual_time:
+                self._last_finish.pop(item.key, None)
+        return item
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            if not self._heap:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            await self._in_flight.acquire()
+            await self._acquire_token()
+
+            item = self._pop() if self._heap else None
+            if item is None or item.future.done():
+                self._in_flight.release()
+                continue
+
+            self._wait_times.append(time.monotonic() - item.enqueued_at)
+            self._dispatched += 1
+            self._running += 1
+            asyncio.create_task(self._run(item))
+
+    async def _run(self, item: _QueuedCall) -> None:
+        try:
+            response = await item.call()
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+            return
+        finally:
+            self._running -= 1
+            self._in_flight.release()
+
+        if response.status_code == 429:
+            self._rate_limited += 1
+            await self._pause(self._retry_after(response))
+            if item.attempts < self.max_retries and not item.future.done():
+                item.attempts += 1
+                self._push(item)
+                return
+
+        if not item.future.done():
+            item.future.set_result(response)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return max(float(response.headers.get("Retry-After", 1)), 0.0)
+        except ValueError:
+            return 1.0
+
+    async def _pause(self, seconds: float) -> None:
+        """Pauses dispatching on this worker and, through Redis, on the others."""
+        logger.warning(f"Spotify rate limit hit, pausing for {seconds}s")
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        try:
+            await self.redis.connection.set(
+                PAUSE_KEY, 1, px=max(int(seconds * 1000), 1)
+            )
+        except RedisError as e:
+            logger.error(f"Error sharing Spotify rate limit pause: {e}")
+
+    async def _acquire_token(self) -> None:
+        while True:
+            wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                wait = await self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _reserve(self) -> float:
+        """Takes a token from the shared bucket, returns seconds to wait if none."""
+        try:
+            wait_ms = await self._bucket(
+                keys=[BUCKET_KEY, PAUSE_KEY], args=[self.rate, self.burst]
+            )
+            return int(wait_ms) / 1000
+        except RedisError as e:
+            logger.error(f"Error using the shared Spotify rate limit: {e}")
+            return self._reserve_local()
+
+    def _reserve_local(self) -> float:
+        now = time.monotonic()
+        self._local_tokens = min(
+            self.burst, self._local_tokens + (now - self._local_refilled_at) * self.rate
+        )
+        self._local_refilled_at = now
+        if self._local_tokens < 1:
+            return (1 - self._local_tokens) / self.rate
+        self._local_tokens -= 1
+        return 0.0
+
+
+def get_spotify_scheduler(request: Request) -> SpotifyScheduler:
+    """
+    Provides the scheduler created in the application lifespan.
+
+    Returns:
+        SpotifyScheduler: The process-wide Spotify scheduler
+    """
+    return request.app.state.spotify_scheduler
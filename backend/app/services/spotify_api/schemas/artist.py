@@ -1,6 +1,6 @@
-from pydantic import BaseModel, HttpUrl
 from typing import Optional
 
+from pydantic import BaseModel, HttpUrl
 
 """
 Spotify Artist Schema: It defines the structure of the artist object returned by the Spotify API.
@@ -0,0 +1,155 @@
+import copy
+import json
+import types
+from functools import lru_cache
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    TypeVar,
+    Union,
+    cast,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, SkipValidation, TypeAdapter, create_model
+from pydantic_core import Url
+
+from backend.app.settings import GLOBAL_SETTINGS
+
+"""
+Fast-path decoding of Spotify payloads through cached TypeAdapters, instead
+of going through ``Model(**response.json())``.
+"""
+
+# Type definition for the decoded value
+T = TypeVar("T")
+
+# Large fields no caller reads, trusted decoding keeps them as parsed
+UNREAD_FIELDS = frozenset({"available_markets"})
+
+
+def _is_url(annotation: Any) -> bool:
+    return get_origin(annotation) is Annotated and get_args(annotation)[0] is Url
+
+
+def map_annotation(annotation: Any, transform: Callable[[Any], Any]) -> Any:
+    """
+    Rewrites the types an annotation is made of.
+
+    ``transform`` is called on the annotation and, as long as it returns its
+    argument unchanged, on the arguments of unions and generics in turn.
+
+    Returns:
+        Any: The rewritten annotation, the same object if nothing changed
+    """
+    replaced = transform(annotation)
+    if replaced is not annotation:
+        return replaced
+
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is None or origin is Annotated or not args:
+        return annotation
+    mapped_args = tuple(map_annotation(arg, transform) for arg in args)
+    if mapped_args == args:
+        return annotation
+    if origin in (Union, types.UnionType):
+        return Union[mapped_args]
+    return origin[mapped_args]
+
+
+def is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _trusted_type(annotation: Any) -> Any:
+    if annotation is Url or _is_url(annotation):
+        return str
+    if is_model(annotation):
+        return trusted_model(annotation)
+    return annotation
+
+
+def trusted_annotation(annotation: Any) -> Any:
+    """Rewrites an annotation with models replaced by their trusted variant."""
+    return map_annotation(annotation, _trusted_type)
+
+
+@lru_cache(maxsize=None)
+def trusted_model(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    Builds the trusted variant of a model.
+
+    The variant subclasses the model, so it is accepted wherever the model
+    is, but keeps URLs as plain strings and ``UNREAD_FIELDS`` unvalidated:
+    Spotify already sends well-formed data and parsing every image URL into a
+    ``Url`` and copying every market list adds up on large payloads.
+
+    Args:
+        model: The model to derive from
+
+    Returns:
+        type[BaseModel]: The variant, or the model itself if nothing changes
+    """
+    fields: dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        annotation: Any
+        if name in UNREAD_FIELDS:
+            # Built at runtime, a type checker only sees a type expression
+            annotation = cast(Any, SkipValidation)[field.annotation]
+        else:
+            annotation = trusted_annotation(field.annotation)
+        if annotation is not field.annotation:
+            # A copy, the subclass would otherwise rewrite the base's field
+            fields[name] = (annotation, copy.deepcopy(field))
+    if not fields:
+        return model
+    return create_model(
+        f"Trusted{model.__name__}",
+        __base__=model,
+        __module__=model.__module__,
+        **fields,
+    )
+
+
+# Adapters by type and mode, building one costs far more than a validation
+_adapters: dict[tuple[Any, bool], TypeAdapter] = {}
+
+
+def _adapter(type_: Any, trusted: bool) -> TypeAdapter:
+    adapter = _adapters.get((type_, trusted))
+    if adapter is None:
+        adapter = TypeAdapter(trusted_annotation(type_) if trusted else type_)
+        _adapters[type_, trusted] = adapter
+    return adapter
+
+
+def decode(
+    type_: type[T],
+    content: bytes | str,
+    trusted: bool = GLOBAL_SETTINGS.SPOTIFY_TRUSTED_DECODING,
+) -> T:
+    """
+    Validates a Spotify JSON payload.
+
+    Untrusted payloads are validated straight from their bytes. Trusted ones
+    are parsed by ``json`` first, which beats pydantic's own JSON parser on
+    these payloads, see backend/benchmarks/spotify_decoding.py.
+
+    Args:
+        type_: Model, or any type pydantic can validate (``list[Track]``...)
+        content: The raw response body
+        trusted: Skips URL validation and unread fields, see ``trusted_model``
+
+    Returns:
+        T: The decoded value
+
+    Raises:
+        pydantic.ValidationError: If the payload does not match the type
+        ValueError: If the payload is not JSON
+    """
+    adapter = _adapter(type_, trusted)
+    if trusted:
+        return adapter.validate_python(json.loads(content))
+    return adapter.validate_json(content)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, HttpUrl
 from typing import Optional
 
+from pydantic import BaseModel, HttpUrl
+
 """
 Spotify Player Schema: It defines the structure of the player object returned by the Spotify API.
 """
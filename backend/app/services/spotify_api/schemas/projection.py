@@ -0,0 +1,110 @@
+import copy
+from functools import lru_cache, partial
+from typing import Any, ClassVar, Generic, Iterable, TypeVar, cast
+
+from pydantic import BaseModel, create_model
+
+from backend.app.services.spotify_api.schemas.decoding import (
+    is_model,
+    map_annotation,
+    trusted_annotation,
+)
+
+"""
+Sparse field projection: callers declare the fields they read, Spotify is
+asked for those only and responses are decoded into partial models.
+"""
+
+# Type definition for the projected model
+M = TypeVar("M", bound=BaseModel)
+
+# Selected fields by name, None selecting the whole field
+_Selection = tuple[tuple[str, "_Selection | None"], ...]
+
+
+def _select(fields: Iterable[str]) -> _Selection:
+    """Turns dotted paths into a nested, hashable selection."""
+    tree: dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            child = node.setdefault(part, {})
+            if child is None:
+                # The whole field is already selected
+                break
+            node = child
+        else:
+            node[leaf] = None
+
+    def freeze(node: dict[str, Any]) -> _Selection:
+        return tuple(
+            (name, None if child is None else freeze(child))
+            for name, child in sorted(node.items())
+        )
+
+    return freeze(tree)
+
+
+def _fields_param(selection: _Selection) -> str:
+    """Formats a selection the way Spotify's ``fields`` parameter expects."""
+    return ",".join(
+        name if child is None else f"{name}({_fields_param(child)})"
+        for name, child in selection
+    )
+
+
+def _partial_type(annotation: Any, selection: _Selection) -> Any:
+    return _partial_model(annotation, selection) if is_model(annotation) else annotation
+
+
+@lru_cache(maxsize=None)
+def _partial_model(model: type[BaseModel], selection: _Selection) -> type[BaseModel]:
+    selected = dict(selection)
+    unknown = selected.keys() - model.model_fields.keys()
+    if unknown:
+        raise ValueError(f"{model.__name__} has no field {', '.join(sorted(unknown))}")
+
+    fields: dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        if name not in selected:
+            # Dropped from the schema, the attribute still reads as None
+            fields[name] = (ClassVar[None], None)
+            continue
+
+        child = selected[name]
+        if child is None:
+            annotation = trusted_annotation(field.annotation)
+        else:
+            annotation = map_annotation(
+                field.annotation, partial(_partial_type, selection=child)
+            )
+            if annotation is field.annotation:
+                raise ValueError(f"{model.__name__}.{name} has no nested fields")
+        if annotation is not field.annotation:
+            # A copy, the subclass would otherwise rewrite the base's field
+            fields[name] = (annotation, copy.deepcopy(field))
+    return create_model(
+        f"Partial{model.__name__}",
+        __base__=model,
+        __module__=model.__module__,
+        **fields,
+    )
+
+
+class Projection(Generic[M]):
+    """
+    The part of a Spotify object a caller reads.
+
+    Declared once from dotted paths, e.g. ``Projection(CurrentlyPlaying,
+    ["is_playing", "item.name", "item.album.images.url"])``. ``fields`` is
+    the matching value of Spotify's ``fields`` parameter and ``model`` a
+    subclass of the full model holding only the selected fields: others are
+    not validated nor stored and read as None. URLs are kept as strings.
+    """
+
+    def __init__(self, model: type[M], fields: Iterable[str]):
+        selection = _select(fields)
+        self.fields: str = _fields_param(selection)
+        # A subclass of the model it was derived from
+        self.model = cast(type[M], _partial_model(model, selection))
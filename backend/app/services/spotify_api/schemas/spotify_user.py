@@ -2,7 +2,6 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-
 """
 Spotify User Schema: It defines the structure of the user object returned by the Spotify API.
 """
@@ -35,3 +34,8 @@ class SpotifyUser(BaseModel):
     product: Optional[str] = None
     type: Optional[str] = None
     uri: Optional[str] = None
+
+
+class SpotifyUsersBatch(BaseModel):
+    users: dict[str, SpotifyUser] = {}
+    errors: dict[str, str] = {}
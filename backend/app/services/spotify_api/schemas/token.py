@@ -7,3 +7,5 @@ class SpotifyToken(BaseModel):
     scope: str | None = None
     expires_in: int | None = None
     refresh_token: str | None = None
+    # Set when the token is stored, epoch seconds at which it expires
+    expires_at: float | None = None
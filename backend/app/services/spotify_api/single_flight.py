@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+from redis.exceptions import RedisError
+
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical Spotify calls into one in-flight request.
+
+    Callers sharing a key while a request is running wait for its response
+    instead of issuing their own. Only successful responses are shared, a
+    follower whose leader failed retries with its own call so one bad token
+    cannot fail the others.
+
+    When a Redis client is given, leaders also take a short Redis lock so that
+    identical calls from other workers wait for the published response.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig | None = None,
+        lock_ttl_ms: int = GLOBAL_SETTINGS.SPOTIFY_SINGLE_FLIGHT_LOCK_MS,
+        poll_interval: float = 0.025,
+    ):
+        self.redis = redis
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_interval = poll_interval
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    @staticmethod
+    def make_key(method: str, url: str, params: Any, scope: str) -> str:
+        """Builds a flight key from the endpoint, its params and a token scope."""
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        raw = json.dumps([method, url, params, scope], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[httpx.Response]],
+        url: str,
+    ) -> httpx.Response:
+        """
+        Runs ``fn`` once per key among concurrent callers.
+
+        Args:
+            key: Flight key, see ``make_key``
+            fn: Coroutine factory performing the request
+            url: Requested URL, used to rebuild responses shared through Redis
+        """
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.followers += 1
+            try:
+                response = await asyncio.shield(flight)
+                if response.is_success:
+                    return response
+            except asyncio.CancelledError:
+                if not flight.done():
+                    raise
+            except Exception:
+                pass
+            return await fn()
+
+        self.leaders += 1
+        flight = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = flight
+        try:
+            response = await self._run(key, fn, url)
+            flight.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Followers handle the error themselves, mark it as retrieved.
+            flight.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _run(
+        self, key: str, fn: Callable[[], Awaitable[httpx.Response]], url: str
+    ) -> httpx.Response:
+        if self.redis is None:
+            return await fn()
+
+        connection = self.redis.connection
+        lock_key = f"single_flight:lock:{key}"
+        result_key = f"single_flight:result:{key}"
+        try:
+            acquired = await connection.set(lock_key, 1, nx=True, px=self.lock_ttl_ms)
+        except RedisError as e:
+            logger.error(f"Error taking single-flight lock: {e}")
+            return await fn()
+
+        if acquired:
+            try:
+                await connection.delete(result_key)
+                response = await fn()
+                if response.is_success:
+                    await connection.set(
+                        result_key,
+                        json.dumps(
+                            {
+                                "status": response.status_code,
+                                "content_type": response.headers.get("content-type"),
+                                "body": response.text,
+                            }
+                        ),
+                        px=self.lock_ttl_ms,
+                    )
+                return response
+            finally:
+                try:
+                    await connection.delete(lock_key)
+                except RedisError as e:
+                    logger.error(f"Error releasing single-flight lock: {e}")
+
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                released = not await connection.exists(lock_key)
+                payload = await connection.get(result_key)
+                if payload is not None:
+                    return self._decode(payload, url)
+                if released:
+                    break
+        except RedisError as e:
+            logger.error(f"Error waiting for a shared response: {e}")
+        return await fn()
+
+    @staticmethod
+    def _decode(payload: str, url: str) -> httpx.Response:
+        data = json.loads(payload)
+        headers = {"content-type": data["content_type"]} if data["content_type"] else {}
+        return httpx.Response(
+            data["status"],
+            headers=headers,
+            content=data["body"].encode("utf-8"),
+            request=httpx.Request("GET", url),
+        )
@@ -0,0 +1,79 @@
+import hashlib
+from typing import Awaitable, Callable
+
+from fastapi import Request
+
+from backend.app.services.spotify_api.schemas.spotify_user import SpotifyUser
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.cache.lru import TTLCache
+from backend.app.utils.cache.two_tier import TwoTierCache
+from backend.app.utils.redis.codecs import JSON_CODEC, CompressedCodec
+from backend.app.utils.redis.redis_config import RedisConfig
+
+
+class SpotifyProfileCache:
+    """
+    Two-tier cache of Spotify profiles keyed by Spotify user id.
+
+    Public profiles (``/v1/users/{id}``) and private ones (``/v1/me``, which
+    carry email, country and product) are cached under separate keys so a
+    private profile is never served to another caller.
+    """
+
+    def __init__(self, redis: RedisConfig):
+        self.profiles: TwoTierCache[SpotifyUser] = TwoTierCache(
+            redis,
+            namespace="spotify_profile",
+            encode=lambda user: user.model_dump(mode="json"),
+            decode=SpotifyUser.model_validate,
+            ttl=GLOBAL_SETTINGS.SPOTIFY_PROFILE_CACHE_TTL,
+            stale_ttl=GLOBAL_SETTINGS.SPOTIFY_PROFILE_CACHE_STALE_TTL,
+            max_entries=GLOBAL_SETTINGS.SPOTIFY_PROFILE_CACHE_MAX_ENTRIES,
+            codec=CompressedCodec(JSON_CODEC),
+        )
+        # Access token digest -> Spotify user id, so /v1/me can be served
+        # from the cache once the owner of a token is known.
+        self.token_owners: TTLCache[str] = TTLCache(
+            GLOBAL_SETTINGS.SPOTIFY_PROFILE_CACHE_MAX_ENTRIES,
+            GLOBAL_SETTINGS.SPOTIFY_PROFILE_CACHE_TTL,
+        )
+
+    @staticmethod
+    def _token_digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    async def get_user(
+        self, user_id: str, fetch: Callable[[], Awaitable[SpotifyUser]]
+    ) -> SpotifyUser:
+        """Returns the public profile of a user, fetching it on a miss."""
+        return await self.profiles.get_or_fetch(user_id, fetch)
+
+    async def get_current_user(
+        self, token: str, fetch: Callable[[], Awaitable[SpotifyUser]]
+    ) -> SpotifyUser:
+        """Returns the private profile of the owner of a token."""
+        digest = self._token_digest(token)
+        user_id = self.token_owners.get(digest)
+        if user_id is not None:
+            return await self.profiles.get_or_fetch(f"me:{user_id}", fetch)
+
+        user = await fetch()
+        if user.id:
+            self.token_owners.set(digest, user.id)
+            await self.profiles.set(f"me:{user.id}", user)
+        return user
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drops every cached profile of a user."""
+        await self.profiles.invalidate(user_id)
+        await self.profiles.invalidate(f"me:{user_id}")
+
+
+def get_profile_cache(request: Request) -> SpotifyProfileCache:
+    """
+    Provides the profile cache created in the application lifespan.
+
+    Returns:
+        SpotifyProfileCache: The process-wide profile cache
+    """
+    return request.app.state.profile_cache
@@ -1,20 +1,102 @@
-from backend.app.services.spotify_api.schemas.spotify_user import SpotifyUser
+import asyncio
+import hashlib
+
+from backend.app.services.spotify_api.client import SpotifyClient
+from backend.app.services.spotify_api.schemas.decoding import decode
+from backend.app.services.spotify_api.schemas.spotify_user import (
+    SpotifyUser,
+    SpotifyUsersBatch,
+)
+from backend.app.services.spotify_api.user_management.profile_cache import (
+    SpotifyProfileCache,
+)
 from backend.app.settings import GLOBAL_SETTINGS
 import httpx
-from backend.app.services.spotify_api.exceptions import SpotifyAPIException
+from backend.app.services.spotify_api.exceptions import (
+    SpotifyAPIException,
+    SpotifyRateLimitException,
+)
 import logging
 
 logger = logging.getLogger("USER MANAGER")
 
 
 class UserManager:
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        client: SpotifyClient,
+        cache: SpotifyProfileCache | None = None,
+    ):
         self.token = token
+        self.client = client
+        self.cache = cache
+        self.scheduling_key = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
         self.user_url = GLOBAL_SETTINGS.SPOTIFY_BASE_URL + "v1/"
 
+    @staticmethod
+    def _raise_if_rate_limited(err: httpx.HTTPStatusError) -> None:
+        """Raises SpotifyRateLimitException if Spotify answered with a 429."""
+        if err.response.status_code != 429:
+            return
+        try:
+            retry_after = float(err.response.headers.get("Retry-After", 1))
+        except ValueError:
+            retry_after = 1.0
+        raise SpotifyRateLimitException(
+            f"Spotify rate limit exceeded: {err}", retry_after=retry_after
+        )
+
     async def get_current_user(self) -> SpotifyUser:
         """
-        Gets the current user's information.
+        Gets the current user's information, from the cache when available.
+        """
+        if self.cache is None:
+            return await self._fetch_current_user()
+        return await self.cache.get_current_user(self.token, self._fetch_current_user)
+
+    async def get_user(self, user_id: str) -> SpotifyUser:
+        """
+        Gets a user's information, from the cache when available.
+        """
+        if self.cache is None:
+            return await self._fetch_user(user_id)
+        return await self.cache.get_user(user_id, lambda: self._fetch_user(user_id))
+
+    async def get_users(
+        self,
+        user_ids: list[str],
+        concurrency: int = GLOBAL_SETTINGS.SPOTIFY_BATCH_CONCURRENCY,
+    ) -> SpotifyUsersBatch:
+        """
+        Gets several users' information with a bounded number of concurrent calls.
+
+        Cached profiles are served from the cache, and a failing id does not
+        fail the batch: its error is reported next to the profiles found.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(user_id: str) -> SpotifyUser:
+            async with semaphore:
+                return await self.get_user(user_id)
+
+        results = await asyncio.gather(
+            *(fetch(user_id) for user_id in user_ids), return_exceptions=True
+        )
+
+        batch = SpotifyUsersBatch()
+        for user_id, result in zip(user_ids, results, strict=True):
+            if isinstance(result, SpotifyUser):
+                batch.users[user_id] = result
+            elif isinstance(result, Exception):
+                batch.errors[user_id] = str(result)
+            else:
+                raise result
+        return batch
+
+    async def _fetch_current_user(self) -> SpotifyUser:
+        """
+        Fetches the current user's information from Spotify.
         """
         headers = {
             "Content-Type": "application/json",
@@ -22,13 +104,21 @@ class UserManager:
         }
 
         try:
-            response = httpx.get(self.user_url + "me", headers=headers)
-            logger.info(f"Response status: {response.json()}")
+            response = await self.client.get(
+                self.user_url + "me",
+                headers=headers,
+                scheduling_key=self.scheduling_key,
+                coalesce_scope=self.scheduling_key,
+            )
+            logger.info(f"Response status: {response.status_code}")
             response.raise_for_status()
-            return SpotifyUser(**response.json())
+            return decode(SpotifyUser, response.content)
 
+        except SpotifyRateLimitException:
+            raise
         except httpx.HTTPStatusError as err:
             logger.error(f"Failed to get current user: {err}")
+            self._raise_if_rate_limited(err)
             raise SpotifyAPIException(f"Failed to get current user: {err}")
         except httpx.RequestError as err:
             logger.error(f"Failed to get current user: {err}")
@@ -37,19 +127,29 @@ class UserManager:
             logger.error(f"An unexpected error occurred: {err}")
             raise SpotifyAPIException(f"Failed to get current user: {err}")
 
-    async def get_user(self, user_id: str) -> SpotifyUser:
+    async def _fetch_user(self, user_id: str) -> SpotifyUser:
         """
-        Gets a user's information.
+        Fetches a user's information from Spotify.
         """
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.token}",
         }
         try:
-            response = httpx.get(self.user_url + "users/" + user_id, headers=headers)
+            response = await self.client.get(
+                self.user_url + "users/" + user_id,
+                headers=headers,
+                scheduling_key=self.scheduling_key,
+                # Public profiles are the same for every token, so calls
+                # from different users are coalesced too.
+                coalesce_scope="public",
+            )
             response.raise_for_status()
-            return SpotifyUser(**response.json())
+            return decode(SpotifyUser, response.content)
+        except SpotifyRateLimitException:
+            raise
         except httpx.HTTPStatusError as err:
+            self._raise_if_rate_limited(err)
             raise SpotifyAPIException(f"Failed to get user: {err}")
         except httpx.RequestError as err:
             raise SpotifyAPIException(f"Failed to get user: {err}")
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import time
+from typing import Annotated
+
+import jwt
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.cache.lru import TTLCache
+from backend.app.utils.exceptions import InvalidTokenError
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY = "auth:revoked"
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class Authenticator:
+    """
+    Verifies bearer tokens without touching the database.
+
+    Signatures are checked locally and revoked tokens are recorded in the
+    ``auth:revoked`` sorted set, scored by their expiry so entries can be
+    pruned once the token would be rejected anyway. Tokens that passed both
+    checks are remembered in process for ``cache_ttl`` seconds, which bounds
+    how long a revocation made by another worker takes to apply.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        secret_key: str = GLOBAL_SETTINGS.JWT_SECRET_KEY,
+        cache_ttl: float = GLOBAL_SETTINGS.AUTH_TOKEN_CACHE_TTL,
+        max_entries: int = GLOBAL_SETTINGS.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    ):
+        self.redis = redis
+        self.secret_key = secret_key
+        self._verified: TTLCache[str] = TTLCache(max_entries, cache_ttl)
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _decode(self, token: str) -> dict:
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"Invalid token: {e}") from e
+        if not claims.get("user_id"):
+            raise InvalidTokenError("Invalid token: no user_id claim")
+        return claims
+
+    async def authenticate(self, token: str) -> str:
+        """
+        Checks a bearer token.
+
+        Args:
+            token: The JWT sent by the client
+
+        Returns:
+            str: ID of the user the token was issued to
+
+        Raises:
+            InvalidTokenError: If the token is malformed, expired or revoked
+        """
+        digest = self._digest(token)
+        user_id = self._verified.get(digest)
+        if user_id is not None:
+            return user_id
+
+        claims = self._decode(token)
+        if await self.redis.connection.zscore(REVOKED_KEY, digest) is not None:
+            raise InvalidTokenError("Token has been revoked")
+
+        user_id = claims["user_id"]
+        ttl = self._verified.ttl
+        if claims.get("exp") is not None:
+            ttl = min(ttl, claims["exp"] - time.time())
+        self._verified.set(digest, user_id, ttl)
+        return user_id
+
+    async def revoke(self, token: str) -> None:
+        """
+        Rejects a token from now on, whether or not it is still valid.
+
+        Tokens issued without an expiry stay revoked for good.
+        """
+        digest = self._digest(token)
+        self._verified.delete(digest)
+        try:
+            expires_at = jwt.decode(
+                token, options={"verify_signature": False, "verify_exp": False}
+            ).get("exp")
+        except jwt.PyJWTError:
+            # Not a token this service could accept, nothing to revoke
+            return
+
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(REVOKED_KEY, {digest: expires_at or "+inf"})
+            pipe.zremrangebyscore(REVOKED_KEY, "-inf", now)
+
+
+def get_authenticator(request: Request) -> Authenticator:
+    """
+    Provides the authenticator created in the application lifespan.
+
+    Returns:
+        Authenticator: The process-wide authenticator
+    """
+    return request.app.state.authenticator
+
+
+async def get_bearer_token(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)],
+) -> str:
+    """
+    Reads the bearer token of the request.
+
+    Raises:
+        HTTPException: If the request carries no bearer token
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return credentials.credentials
+
+
+async def get_current_user_id(
+    token: Annotated[str, Depends(get_bearer_token)],
+    authenticator: Annotated[Authenticator, Depends(get_authenticator)],
+) -> str:
+    """
+    Authenticates the request from its bearer token.
+
+    Returns:
+        str: ID of the authenticated user
+
+    Raises:
+        HTTPException: If the token is invalid, expired or revoked
+    """
+    try:
+        return await authenticator.authenticate(token)
+    except InvalidTokenError as e:
+        raise HTTPException(
+            status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"}
+        )
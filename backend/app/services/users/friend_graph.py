@@ -0,0 +1,186 @@
+import logging
+import random
+from typing import Annotated, Iterable, cast
+
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.app.config.database import get_async_db
+from backend.app.repositories.user_repository import UserRepository
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis cannot store empty sets, every loaded set holds this placeholder so a
+# user without friends is still distinguishable from a user not loaded yet.
+PLACEHOLDER = ""
+
+# Applies SADD/SREM only to sets already loaded, a partial set would otherwise
+# be mistaken for the full friend list.
+UPDATE_IF_LOADED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call(ARGV[1], KEYS[1], unpack(ARGV, 2))
+end
+return 0
+"""
+
+
+class FriendGraph:
+    """
+    Friend adjacency index kept in Redis, one set of friend ids per user.
+
+    Sets are loaded lazily from friends_association and then kept up to date
+    incrementally after every friendship write. Mutual friends are a SINTER
+    and suggestions a ZUNIONSTORE of the friends' sets, so neither loads any
+    ORM object. Loaded sets expire after ``ttl`` seconds of inactivity, which
+    also bounds how long a missed update can go unnoticed.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        user_repository: UserRepository,
+        ttl: int = GLOBAL_SETTINGS.FRIEND_GRAPH_TTL,
+        suggestions_sample: int = GLOBAL_SETTINGS.FRIEND_SUGGESTIONS_SAMPLE,
+    ):
+        self.redis = redis
+        self.user_repository = user_repository
+        self.ttl = ttl
+        self.suggestions_sample = suggestions_sample
+        self._update_if_loaded = redis.connection.register_script(
+            UPDATE_IF_LOADED_SCRIPT
+        )
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"friend_graph:{user_id}"
+
+    async def _ensure_loaded(self, user_ids: Iterable[str]) -> None:
+        """Loads the sets of the given users that are not in Redis yet."""
+        user_ids = list(dict.fromkeys(user_ids))
+        connection = self.redis.connection
+
+        # EXPIRE both refreshes the TTL and tells whether the set exists
+        pipe = connection.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.expire(self._key(user_id), self.ttl)
+        loaded = await pipe.execute()
+
+        missing = [
+            user_id for user_id, ok in zip(user_ids, loaded, strict=True) if not ok
+        ]
+        if not missing:
+            return
+
+        friend_ids = await self.user_repository.get_friend_ids(missing)
+        pipe = connection.pipeline(transaction=True)
+        for user_id in missing:
+            key = self._key(user_id)
+            pipe.delete(key)
+            pipe.sadd(key, PLACEHOLDER, *friend_ids.get(user_id, []))
+            pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def friend_ids(self, user_id: str) -> list[str]:
+        """Returns the ids of a user's friends."""
+        await self._ensure_loaded([user_id])
+        friends = await self.redis.connection.smembers(self._key(user_id))
+        friends.discard(PLACEHOLDER)
+        return sorted(friends)
+
+    async def mutual_friends(self, user_id: str, other_id: str) -> list[str]:
+        """
+        Returns the ids of the users both users have as friends.
+
+        Args:
+            user_id: ID of the first user
+            other_id: ID of the second user
+
+        Returns:
+            list[str]: Sorted ids of the shared friends
+        """
+        await self._ensure_loaded([user_id, other_id])
+        # The connection decodes responses, members are strings
+        shared = cast(
+            set[str],
+            await self.redis.connection.sinter(self._key(user_id), self._key(other_id)),
+        )
+        shared.discard(PLACEHOLDER)
+        return sorted(shared)
+
+    async def suggestions(self, user_id: str, limit: int) -> list[tuple[str, int]]:
+        """
+        Ranks friends of friends by the number of friends they share with a user.
+
+        Only a random sample of ``suggestions_sample`` friends is expanded, so
+        the cost stays flat for users with thousands of friends.
+
+        Args:
+            user_id: ID of the user to suggest friends to
+            limit: Maximum number of suggestions
+
+        Returns:
+            list[tuple[str, int]]: Suggested ids with their shared friends count
+        """
+        await self._ensure_loaded([user_id])
+        friends = await self.redis.connection.smembers(self._key(user_id))
+        friends.discard(PLACEHOLDER)
+        if not friends:
+            return []
+
+        sample = random.sample(
+            sorted(friends), min(len(friends), self.suggestions_sample)
+        )
+        await self._ensure_loaded(sample)
+
+        # Sets count as sorted sets with a score of 1, the union sums them
+        scratch = f"friend_graph:suggestions:{user_id}:{random.getrandbits(32)}"
+        pipe = self.redis.connection.pipeline(transaction=True)
+        pipe.zunionstore(scratch, [self._key(friend_id) for friend_id in sample])
+        pipe.zrem(scratch, PLACEHOLDER, user_id, *friends)
+        pipe.zrevrange(scratch, 0, limit - 1, withscores=True)
+        pipe.delete(scratch)
+        *_, ranked, _ = await pipe.execute()
+        return [(candidate, int(score)) for candidate, score in ranked]
+
+    async def add_friends(self, user_id: str, friend_ids: Iterable[str]) -> None:
+        """Records new friendships of a user."""
+        await self._update(user_id, "SADD", friend_ids)
+
+    async def remove_friends(self, user_id: str, friend_ids: Iterable[str]) -> None:
+        """Records removed friendships of a user."""
+        await self._update(user_id, "SREM", friend_ids)
+
+    async def invalidate(self, *user_ids: str) -> None:
+        """Drops the sets of the given users, they are reloaded on next use."""
+        if user_ids:
+            await self.redis.delete(*(self._key(user_id) for user_id in user_ids))
+
+    async def _update(
+        self, user_id: str, command: str, friend_ids: Iterable[str]
+    ) -> None:
+        friend_ids = list(friend_ids)
+        if not friend_ids:
+            return
+        try:
+            await self._update_if_loaded(
+                keys=[self._key(user_id)], args=[command, *friend_ids]
+            )
+        except RedisError as e:
+            logger.error(f"Error updating friend graph of {user_id}: {e}")
+            await self.invalidate(user_id)
+
+
+def get_friend_graph(
+    redis: Annotated[RedisConfig, Depends(get_redis)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+) -> FriendGraph:
+    """
+    Provides a friend graph bound to the request's database session.
+
+    Returns:
+        FriendGraph: Friend graph loading missing sets through the session
+    """
+    return FriendGraph(redis, UserRepository(db))
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable
+
+from fastapi.requests import HTTPConnection
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from backend.app.services.spotify_api.schemas.player import CurrentlyPlaying
+from backend.app.services.spotify_api.schemas.projection import Projection
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+# Compares the new state with the stored one, stores the changed fields and
+# publishes only those. progress_ms moves on every poll, it is sent along
+# with real changes but never triggers a message on its own.
+PUBLISH_DELTA_SCRIPT = """
+local parts = {}
+local changed = {}
+for i = 5, #ARGV, 2 do
+    local field, value = ARGV[i], ARGV[i + 1]
+    if redis.call('HGET', KEYS[1], field) ~= value then
+        redis.call('HSET', KEYS[1], field, value)
+        table.insert(parts, '"' .. field .. '":' .. value)
+        table.insert(changed, field)
+    end
+end
+redis.call('HSET', KEYS[1], 'progress_ms', ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if #changed > 0 then
+    table.insert(parts, '"progress_ms":' .. ARGV[4])
+    redis.call('PUBLISH', ARGV[1],
+        '{"user_id":' .. ARGV[3] .. ',"changes":{' .. table.concat(parts, ',') .. '}}')
+end
+return changed
+"""
+
+
+# Fields of a Spotify playback read by NowPlaying.from_currently_playing
+NOW_PLAYING_PROJECTION = Projection(
+    CurrentlyPlaying,
+    [
+        "is_playing",
+        "progress_ms",
+        "device.name",
+        "item.id",
+        "item.name",
+        "item.duration_ms",
+        "item.artists.name",
+        "item.album.name",
+        "item.album.images.url",
+    ],
+)
+
+
+class NowPlaying(BaseModel):
+    """Compact view of a user's playback, the unit of every delta"""
+
+    is_playing: bool = False
+    track_id: str | None = None
+    track_name: str | None = None
+    artists: list[str] | None = None
+    album_name: str | None = None
+    album_image_url: str | None = None
+    duration_ms: int | None = None
+    device_name: str | None = None
+    progress_ms: int | None = None
+
+    @classmethod
+    def from_currently_playing(
+        cls, currently_playing: CurrentlyPlaying | None
+    ) -> "NowPlaying":
+        """Projects a Spotify playback state, None meaning nothing is playing."""
+        if currently_playing is None:
+            return cls()
+
+        track = currently_playing.item
+        album = track.album if track else None
+        images = album.images if album and album.images else []
+        return cls(
+            is_playing=bool(currently_playing.is_playing),
+            track_id=track.id if track else None,
+            track_name=track.name if track else None,
+            artists=(
+                [artist.name for artist in track.artists or [] if artist.name]
+                if track
+                else None
+            ),
+            album_name=album.name if album else None,
+            album_image_url=str(images[0].url) if images and images[0].url else None,
+            duration_ms=track.duration_ms if track else None,
+            device_name=(
+                currently_playing.device.name if currently_playing.device else None
+            ),
+            progress_ms=currently_playing.progress_ms,
+        )
+
+
+class Subscription:
+    """
+    Deltas waiting to be sent to one client.
+
+    Pending changes are merged per user, so a slow client skips intermediate
+    states and only receives the latest value of each field (drop stale).
+    """
+
+    def __init__(self, user_ids: Iterable[str]):
+        self.user_ids = set(user_ids)
+        self.dropped = 0
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, user_id: str, changes: dict[str, Any]) -> None:
+        pending = self._pending.get(user_id)
+        if pending is None:
+            self._pending[user_id] = dict(changes)
+        else:
+            self.dropped += 1
+            pending.update(changes)
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> dict[str, dict[str, Any]]:
+        """
+        Waits for pending deltas and takes all of them.
+
+        Returns:
+            dict[str, dict[str, Any]]: Changes by user id, empty on timeout
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        batch, self._pending = self._pending, {}
+        return batch
+
+
+class NowPlayingHub:
+    """
+    Fans now-playing changes out to subscribed clients across workers.
+
+    Publishers store each user's state in a ``now_playing:state:{id}`` hash
+    and publish the changed fields on the ``now_playing:{id}`` channel. Each
+    worker holds a single pub/sub connection, subscribed to the channels its
+    connected clients need, and dispatches messages to their subscriptions.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        state_ttl: int = GLOBAL_SETTINGS.NOW_PLAYING_STATE_TTL,
+    ):
+        self.redis = redis
+        self.state_ttl = state_ttl
+        self._publish_delta = redis.connection.register_script(PUBLISH_DELTA_SCRIPT)
+        self._pubsub = redis.connection.pubsub()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._has_channels = asyncio.Event()
+        self._reader: asyncio.Task | None = None
+
+    @staticmethod
+    def _state_key(user_id: str) -> str:
+        return f"now_playing:state:{user_id}"
+
+    @staticmethod
+    def _channel(user_id: str) -> str:
+        return f"now_playing:{user_id}"
+
+    async def start(self) -> None:
+        """Starts the pub/sub reader."""
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_loop())
+            logger.info("Now playing hub started.")
+
+    async def stop(self) -> None:
+        """Stops the reader and closes the pub/sub connection."""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        await self._pubsub.aclose()
+        logger.info("Now playing hub stopped.")
+
+    async def publish(self, user_id: str, now_playing: NowPlaying) -> list[str]:
+        """
+        Stores a user's playback and publishes what changed.
+
+        Args:
+            user_id: The user's ID
+            now_playing: The user's current playback
+
+        Returns:
+            list[str]: Names of the fields that changed
+        """
+        state = now_playing.model_dump(mode="json")
+        progress_ms = state.pop("progress_ms")
+        args: list[Any] = [
+            self._channel(user_id),
+            self.state_ttl,
+            json.dumps(user_id),
+            json.dumps(progress_ms),
+        ]
+        for field, value in state.items():
+            args.extend((field, json.dumps(value)))
+        return await self._publish_delta(keys=[self._state_key(user_id)], args=args)
+
+    async def snapshot(self, user_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """
+        Reads the last published state of many users in one round trip.
+
+        Returns:
+            dict[str, dict[str, Any]]: State by user id, unknown users omitted
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+
+        pipe = self.redis.connection.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(self._state_key(user_id))
+        states = await pipe.execute()
+        return {
+            user_id: {field: json.loads(value) for field, value in state.items()}
+            for user_id, state in zip(user_ids, states, strict=True)
+            if state
+        }
+
+    @asynccontextmanager
+    async def subscription(
+        self, user_ids: Iterable[str]
+    ) -> AsyncIterator[Subscription]:
+        """Subscribes to the changes of some users for the duration of the block."""
+        subscription = Subscription(user_ids)
+        new_channels = []
+        for user_id in subscription.user_ids:
+            subscribers = self._subscribers.setdefault(user_id, set())
+            if not subscribers:
+                new_channels.append(self._channel(user_id))
+            subscribers.add(subscription)
+        try:
+            if new_channels:
+                await self._pubsub.subscribe(*new_channels)
+                self._has_channels.set()
+            yield subscription
+        finally:
+            unused_channels = []
+            for user_id in subscription.user_ids:
+                subscribers = self._subscribers.get(user_id, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+                    unused_channels.append(self._channel(user_id))
+            if unused_channels:
+                try:
+                    await self._pubsub.unsubscribe(*unused_channels)
+                except RedisError as e:
+                    logger.error(f"Error unsubscribing from now playing: {e}")
+
+    async def _read_loop(self) -> None:
+        # The connection only exists once something was subscribed to
+        await self._has_channels.wait()
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except RedisError as e:
+                logger.error(f"Error reading now playing messages: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+
+            # A bad message is dropped, failing here would stop every listener
+            try:
+                payload = json.loads(message["data"])
+                user_id, changes = payload["user_id"], payload["changes"]
+                for subscription in self._subscribers.get(user_id, ()):
+                    subscription.push(user_id, changes)
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"Dropping malformed now playing message: {message}")
+
+
+def get_now_playing_hub(connection: HTTPConnection) -> NowPlayingHub:
+    """
+    Provides the now playing hub created in the application lifespan.
+
+    Returns:
+        NowPlayingHub: The process-wide now playing hub
+    """
+    return connection.app.state.now_playing
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TypeVar
+
+import bcrypt
+from fastapi import Request
+
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.exceptions import PasswordHashingOverloadedError
+
+logger = logging.getLogger(__name__)
+
+# Type definition for the result of a hashing job
+R = TypeVar("R")
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def _check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool.
+
+    Hashing costs hundreds of milliseconds of CPU, running it in worker
+    processes keeps the event loop responsive and spreads the work across
+    cores. At most ``max_pending`` jobs may be queued or running, further calls
+    fail fast with PasswordHashingOverloadedError.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = GLOBAL_SETTINGS.PASSWORD_HASH_WORKERS,
+        max_pending: int = GLOBAL_SETTINGS.PASSWORD_HASH_MAX_PENDING,
+        rounds: int = GLOBAL_SETTINGS.PASSWORD_HASH_ROUNDS,
+    ):
+        self.max_pending = max_pending
+        self.rounds = rounds
+        # Checked when the user does not exist, hashed with the same rounds so
+        # that unknown emails take as long to reject as wrong passwords
+        self._dummy_hash = _hash_password("dummy-password", rounds)
+        self._pending = 0
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def shutdown(self) -> None:
+        """Stops the worker processes."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        logger.info("Password hasher stopped.")
+
+    async def _submit(self, fn: Callable[..., R], *args: object) -> R:
+        if self._pending >= self.max_pending:
+            raise PasswordHashingOverloadedError("Too many password checks pending")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hashes a password with a fresh salt."""
+        return await self._submit(_hash_password, password, self.rounds)
+
+    async def verify(self, password: str, password_hash: str | None) -> bool:
+        """
+        Checks a password against a hash.
+
+        Passing None (unknown user) still runs a check against a dummy hash.
+        """
+        if password_hash is None:
+            await self._submit(_check_password, password, self._dummy_hash)
+            return False
+        return await self._submit(_check_password, password, password_hash)
+
+
+def get_password_hasher(request: Request) -> PasswordHasher:
+    """
+    Provides the password hasher created in the application lifespan.
+
+    Returns:
+        PasswordHasher: The process-wide password hasher
+    """
+    return request.app.state.password_hasher
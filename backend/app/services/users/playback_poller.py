@@ -0,0 +1,363 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import Request
+from pydantic import BaseModel
+
+from backend.app.config.database import async_session_factory
+from backend.app.repositories.user_repository import UserRepository
+from backend.app.services.spotify_api.auth.token_manager import SpotifyTokenManager
+from backend.app.services.spotify_api.client import SpotifyClient
+from backend.app.services.spotify_api.exceptions import (
+    SpotifyAPIException,
+    SpotifyAuthenticationException,
+    SpotifyRateLimitException,
+)
+from backend.app.services.spotify_api.player_management.player_manager import (
+    PlayerManager,
+)
+from backend.app.services.spotify_api.schemas.player import CurrentlyPlaying
+from backend.app.services.users.now_playing import (
+    NOW_PLAYING_PROJECTION,
+    NowPlaying,
+    NowPlayingHub,
+)
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "playback_poller:leader"
+
+# Seconds added to the remaining track time, so the poll lands on the next
+# track rather than on the last second of the current one.
+TRACK_END_MARGIN = 1.0
+
+# Takes or renews the poller lease, only its holder polls Spotify.
+ACQUIRE_LEADER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+RELEASE_LEADER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class PollerStats(BaseModel):
+    """Snapshot of the background playback poller"""
+
+    is_leader: bool
+    sessions: int
+    in_flight: int
+    polls: int
+    changes: int
+    errors: int
+    expired: int
+    next_poll_in: float | None
+
+
+@dataclass
+class _Session:
+    spotify_id: str
+    user_id: str
+    token: str
+    back_off: float = 0.0
+    last_seen: tuple[str | None, bool] | None = None
+
+
+class PlaybackPoller:
+    """
+    Polls the playback of every user with a Spotify session.
+
+    One worker holds a lease in Redis and polls for everyone, the others stay
+    idle and take over when the lease expires. Sessions are the users with an
+    unexpired Spotify token, polled on a schedule: while a track plays
+    the next poll is set right after it should end, paused and idle sessions
+    are polled less and less often. At most ``concurrency`` polls run at once
+    and a user's now playing state is only published when the track or the
+    play state changes.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        client: SpotifyClient,
+        tokens: SpotifyTokenManager,
+        now_playing: NowPlayingHub,
+        concurrency: int = GLOBAL_SETTINGS.PLAYBACK_POLLER_CONCURRENCY,
+        discovery_interval: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_DISCOVERY_INTERVAL,
+        min_interval: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_MIN_INTERVAL,
+        max_interval: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_MAX_INTERVAL,
+        idle_interval: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_IDLE_INTERVAL,
+        idle_max_interval: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_IDLE_MAX_INTERVAL,
+        leader_ttl: float = GLOBAL_SETTINGS.PLAYBACK_POLLER_LEADER_TTL,
+    ):
+        self.redis = redis
+        self.client = client
+        self.tokens = tokens
+        self.now_playing = now_playing
+        self.discovery_interval = discovery_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.idle_max_interval = idle_max_interval
+        self.leader_ttl = leader_ttl
+        self.instance_id = uuid.uuid4().hex
+        self.is_leader = False
+
+        self._acquire_leader = redis.connection.register_script(ACQUIRE_LEADER_SCRIPT)
+        self._release_leader = redis.connection.register_script(RELEASE_LEADER_SCRIPT)
+        self._sessions: dict[str, _Session] = {}
+        self._rejected: dict[str, str] = {}
+        self._schedule: list[tuple[float, int, _Session]] = []
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._polls: set[asyncio.Task] = set()
+        self._tasks: list[asyncio.Task] = []
+
+        self._poll_count = 0
+        self._changes = 0
+        self._errors = 0
+        self._expired = 0
+
+    async def start(self) -> None:
+        """Starts session discovery and the polling loop."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._discovery_loop()),
+                asyncio.create_task(self._poll_loop()),
+            ]
+            logger.info("Playback poller started.")
+
+    async def stop(self) -> None:
+        """Stops polling and gives the lease up."""
+        for task in [*self._tasks, *self._polls]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._polls, return_exceptions=True)
+        self._tasks = []
+        self._polls.clear()
+        if self.is_leader:
+            await self._release_leader(keys=[LEADER_KEY], args=[self.instance_id])
+            self.is_leader = False
+        logger.info("Playback poller stopped.")
+
+    def stats(self) -> PollerStats:
+        """Returns session and poll counters."""
+        return PollerStats(
+            is_leader=self.is_leader,
+            sessions=len(self._sessions),
+            in_flight=len(self._polls),
+            polls=self._poll_count,
+            changes=self._changes,
+            errors=self._errors,
+            expired=self._expired,
+            next_poll_in=(
+                max(self._schedule[0][0] - time.monotonic(), 0.0)
+                if self._schedule
+                else None
+            ),
+        )
+
+    async def discover(self) -> int:
+        """
+        Syncs the polled sessions with the unexpired Spotify tokens.
+
+        New sessions are polled within ``min_interval``, spread to avoid a
+        burst, and sessions whose token disappeared are dropped.
+
+        Returns:
+            int: Number of sessions polled
+        """
+        active = await self.tokens.active()
+        tokens = {
+            spotify_id: token.access_token
+            for spotify_id, token in (await self.tokens.get_many(active)).items()
+            if token.access_token
+        }
+
+        # Tokens Spotify rejected stay ignored until they are replaced
+        self._rejected = {
+            spotify_id: token
+            for spotify_id, token in self._rejected.items()
+            if tokens.get(spotify_id) == token
+        }
+        for spotify_id in self._rejected:
+            del tokens[spotify_id]
+
+        user_ids: dict[str, str] = {}
+        if tokens:
+            async with async_session_factory() as db:
+                user_ids = await UserRepository(db).get_ids_by_spotify_ids(list(tokens))
+
+        now = time.monotonic()
+        sessions: dict[str, _Session] = {}
+        for spotify_id, user_id in user_ids.items():
+            session = self._sessions.get(spotify_id)
+            if session is None or session.user_id != user_id:
+                session = _Session(spotify_id, user_id, tokens[spotify_id])
+                self._push(session, now + random.uniform(0, self.min_interval))
+            else:
+                session.token = tokens[spotify_id]
+            sessions[spotify_id] = session
+        self._sessions = sessions
+        self._wakeup.set()
+        return len(sessions)
+
+    def _push(self, session: _Session, due: float) -> None:
+        self._sequence += 1
+        heapq.heappush(self._schedule, (due, self._sequence, session))
+        self._wakeup.set()
+
+    def _is_polled(self, session: _Session) -> bool:
+        return self._sessions.get(session.spotify_id) is session
+
+    async def _discovery_loop(self) -> None:
+        while True:
+            try:
+                self.is_leader = bool(
+                    await self._acquire_leader(
+                        keys=[LEADER_KEY],
+                        args=[self.instance_id, int(self.leader_ttl * 1000)],
+                    )
+                )
+                if self.is_leader:
+                    await self.discover()
+                else:
+                    self._sessions.clear()
+            except Exception as e:
+                logger.error(f"Error discovering Spotify sessions: {e}")
+            await asyncio.sleep(self.discovery_interval)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._schedule:
+                await self._wakeup.wait()
+                continue
+
+            due, _, session = self._schedule[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._schedule)
+            if not self._is_polled(session):
+                continue
+
+            # Waiting here rather than in the task keeps the backlog in the
+            # schedule, where it stays ordered by due time.
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._poll(session))
+            self._polls.add(task)
+            task.add_done_callback(self._poll_done)
+
+    def _poll_done(self, task: asyncio.Task) -> None:
+        self._polls.discard(task)
+        self._semaphore.release()
+
+    async def _poll(self, session: _Session) -> None:
+        self._poll_count += 1
+        try:
+            currently_playing = await PlayerManager(
+                session.token, self.client
+            ).get_currently_playing(NOW_PLAYING_PROJECTION)
+        except SpotifyAuthenticationException:
+            # Polled again once the token is refreshed or replaced
+            self._expired += 1
+            self._rejected[session.spotify_id] = session.token
+            if self._is_polled(session):
+                del self._sessions[session.spotify_id]
+            return
+        except SpotifyRateLimitException as e:
+            self._errors += 1
+            delay = max(e.retry_after or 0.0, self._back_off(session))
+        except SpotifyAPIException as e:
+            self._errors += 1
+            logger.warning(f"Error polling {session.spotify_id}: {e}")
+            delay = self._back_off(session)
+        except Exception as e:
+            # Transport or decoding errors, the session is polled again later
+            self._errors += 1
+            logger.error(f"Unexpected error polling {session.spotify_id}: {e}")
+            delay = self._back_off(session)
+        else:
+            delay = self._next_delay(session, currently_playing)
+            try:
+                await self._record(session, currently_playing)
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Error publishing playback of {session.user_id}: {e}")
+
+        if self._is_polled(session):
+            self._push(session, time.monotonic() + delay)
+
+    async def _record(
+        self, session: _Session, currently_playing: CurrentlyPlaying | None
+    ) -> None:
+        """Publishes the playback if the track or the play state changed."""
+        now_playing = NowPlaying.from_currently_playing(currently_playing)
+        seen = (now_playing.track_id, now_playing.is_playing)
+        if seen == session.last_seen:
+            return
+        await self.now_playing.publish(session.user_id, now_playing)
+        session.last_seen = seen
+        self._changes += 1
+
+    def _next_delay(
+        self, session: _Session, currently_playing: CurrentlyPlaying | None
+    ) -> float:
+        """
+        Computes when to poll a session again.
+
+        While a track plays, the next poll is due when it should end, capped
+        by ``max_interval`` so skips are noticed. Paused and idle sessions back
+        off exponentially from ``idle_interval`` to ``idle_max_interval``.
+        """
+        track = currently_playing.item if currently_playing else None
+        if not currently_playing or not currently_playing.is_playing or not track:
+            return self._back_off(session)
+
+        session.back_off = 0.0
+        if track.duration_ms is None or currently_playing.progress_ms is None:
+            return self.max_interval
+        remaining = (track.duration_ms - currently_playing.progress_ms) / 1000
+        return min(
+            max(remaining + TRACK_END_MARGIN, self.min_interval), self.max_interval
+        )
+
+    def _back_off(self, session: _Session) -> float:
+        if session.back_off:
+            session.back_off = min(session.back_off * 2, self.idle_max_interval)
+        else:
+            session.back_off = self.idle_interval
+        return session.back_off
+
+
+def get_playback_poller(request: Request) -> PlaybackPoller:
+    """
+    Provides the playback poller created in the application lifespan.
+
+    Returns:
+        PlaybackPoller: The process-wide playback poller
+    """
+    return request.app.state.playback_poller
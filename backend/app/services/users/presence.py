@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, cast
+
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlalchemy import bindparam, update
+
+from backend.app.config.database import async_engine
+from backend.app.models.users import User, UserOut
+from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+ONLINE_KEY = "presence:online"
+DIRTY_KEY = "presence:dirty"
+
+# Records a heartbeat in one round trip. Returns 1 when the user just came
+# online or changed track, and only then marks them for the next flush.
+HEARTBEAT_SCRIPT = """
+local existed = redis.call('EXISTS', KEYS[1])
+local previous = redis.call('HGET', KEYS[1], 'currently_playing')
+redis.call('HSET', KEYS[1], 'currently_playing', ARGV[1], 'updated_at', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[4])
+if existed == 0 or previous ~= ARGV[1] then
+    redis.call('SADD', KEYS[3], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# Statements used by the flusher, executed once per batch
+SET_ONLINE = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("user_id"))
+    .values(is_online=True, currently_playing=bindparam("playing"))
+)
+SET_OFFLINE = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("user_id"))
+    .values(is_online=False)
+)
+
+
+@dataclass
+class Presence:
+    currently_playing: str | None
+    updated_at: float
+
+
+class PresenceStore:
+    """
+    Keeps user presence in Redis instead of the users row.
+
+    - Each online user has a ``presence:{id}`` hash that expires when
+      heartbeats stop, so a missing hash means offline.
+    - ``presence:online`` is a sorted set of online users scored by their
+      last heartbeat.
+    - Users whose presence changed are collected in ``presence:dirty`` and a
+      background task persists their last known state to Postgres in batches
+      (write-behind), so heartbeats never touch the database.
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        ttl: int = GLOBAL_SETTINGS.PRESENCE_TTL,
+        flush_interval: float = GLOBAL_SETTINGS.PRESENCE_FLUSH_INTERVAL,
+        flush_batch: int = GLOBAL_SETTINGS.PRESENCE_FLUSH_BATCH,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._heartbeat = redis.connection.register_script(HEARTBEAT_SCRIPT)
+        self._flusher: asyncio.Task | None = None
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"presence:{user_id}"
+
+    async def start(self) -> None:
+        """Starts the write-behind flusher."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+            logger.info("Presence flusher started.")
+
+    async def stop(self) -> None:
+        """Stops the flusher after a last flush."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+            await self.flush()
+            logger.info("Presence flusher stopped.")
+
+    async def heartbeat(self, user_id: str, currently_playing: str | None) -> bool:
+        """
+        Marks a user online for the next ``ttl`` seconds.
+
+        Args:
+            user_id: The user's ID
+            currently_playing: What the user is listening to, if anything
+
+        Returns:
+            bool: True if the user just came online or changed track
+        """
+        changed = await self._heartbeat(
+            keys=[self._key(user_id), ONLINE_KEY, DIRTY_KEY],
+            args=[currently_playing or "", time.time(), self.ttl, user_id],
+        )
+        return bool(changed)
+
+    async def set_offline(self, user_id: str) -> None:
+        """Marks a user offline immediately."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(user_id))
+            pipe.zrem(ONLINE_KEY, user_id)
+            pipe.sadd(DIRTY_KEY, user_id)
+
+    async def get_many(self, user_ids: Iterable[str]) -> dict[str, Presence]:
+        """
+        Reads the presence of many users in one round trip.
+
+        Returns:
+            dict[str, Presence]: Presence of the users that are online
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+
+        pipe = self.redis.connection.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hmget(self._key(user_id), "currently_playing", "updated_at")
+        replies = await pipe.execute()
+
+        return {
+            user_id: Presence(playing or None, float(updated_at))
+            for user_id, (playing, updated_at) in zip(user_ids, replies, strict=True)
+            if updated_at is not None
+        }
+
+    async def apply(self, users: list[UserOut]) -> list[UserOut]:
+        """
+        Overrides the presence of users with their live state from Redis.
+
+        Offline users keep the last track persisted in their row.
+        """
+        try:
+            presences = await self.get_many(user.id for user in users)
+        except RedisError as e:
+            logger.error(f"Error reading presence, serving stored state: {e}")
+            return users
+
+        for user in users:
+            presence = presences.get(user.id)
+            user.is_online = presence is not None
+            if presence is not None:
+                user.currently_playing = presence.currently_playing
+        return users
+
+    async def online(self, limit: int) -> tuple[int, list[str]]:
+        """
+        Lists online users, most recent heartbeat first.
+
+        Returns:
+            tuple[int, list[str]]: Number of online users and the first ids
+        """
+        cutoff = time.time() - self.ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcount(ONLINE_KEY, cutoff, "+inf")
+            pipe.zrevrangebyscore(ONLINE_KEY, "+inf", cutoff, start=0, num=limit)
+            total, user_ids = await pipe.execute()
+        return total, user_ids
+
+    async def flush(self) -> int:
+        """
+        Persists the presence of every changed user to Postgres.
+
+        Returns:
+            int: Number of users persisted
+        """
+        await self._expire_stale()
+
+        flushed = 0
+        while True:
+            # The connection decodes responses, members are strings
+            user_ids = cast(
+                list[str],
+                await self.redis.connection.spop(DIRTY_KEY, self.flush_batch),
+            )
+            if not user_ids:
+                return flushed
+            try:
+                presences = await self.get_many(user_ids)
+                online = [
+                    {"user_id": user_id, "playing": presence.currently_playing}
+                    for user_id, presence in presences.items()
+                ]
+                offline = [
+                    {"user_id": user_id}
+                    for user_id in user_ids
+                    if user_id not in presences
+                ]
+                async with async_engine.begin() as connection:
+                    if online:
+                        await connection.execute(SET_ONLINE, online)
+                    if offline:
+                        await connection.execute(SET_OFFLINE, offline)
+                flushed += len(user_ids)
+            except Exception:
+                # Put the batch back so it is retried on the next flush
+                await self.redis.connection.sadd(DIRTY_KEY, *user_ids)
+                raise
+
+    async def _expire_stale(self) -> None:
+        """Moves users whose heartbeats stopped out of the online index."""
+        cutoff = time.time() - self.ttl
+        stale = await self.redis.connection.zrangebyscore(ONLINE_KEY, "-inf", cutoff)
+        if stale:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(ONLINE_KEY, *stale)
+                pipe.sadd(DIRTY_KEY, *stale)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing presence: {e}")
+
+
+def get_presence_store(request: Request) -> PresenceStore:
+    """
+    Provides the presence store created in the application lifespan.
+
+    Returns:
+        PresenceStore: The process-wide presence store
+    """
+    return request.app.state.presence
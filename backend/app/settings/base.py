@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
 
     # Spotify API
     SPOTIFY_CLIENT_ID: str
@@ -19,14 +21,109 @@ class Settings(BaseSettings):
     SPOTIFY_AUTH_URL: str
     SPOTIFY_TOKEN_URL: str
 
+    # Spotify HTTP client
+    SPOTIFY_HTTP2: bool = True
+    SPOTIFY_HTTP_MAX_CONNECTIONS: int = 100
+    SPOTIFY_HTTP_MAX_KEEPALIVE: int = 20
+    SPOTIFY_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    SPOTIFY_HTTP_TIMEOUT: float = 10.0
+    SPOTIFY_HTTP_CONNECT_TIMEOUT: float = 5.0
+    SPOTIFY_HTTP_POOL_TIMEOUT: float = 5.0
+
+    # Spotify outbound scheduler
+    SPOTIFY_RATE_LIMIT_PER_SECOND: float = 10.0
+    SPOTIFY_RATE_LIMIT_BURST: int = 20
+    SPOTIFY_SCHEDULER_MAX_QUEUE: int = 1000
+    SPOTIFY_SCHEDULER_MAX_IN_FLIGHT: int = 50
+    SPOTIFY_SCHEDULER_MAX_RETRIES: int = 3
+
+    # Spotify request coalescing
+    SPOTIFY_SINGLE_FLIGHT_REDIS: bool = False
+    SPOTIFY_SINGLE_FLIGHT_LOCK_MS: int = 2000
+
+    # Spotify payload decoding
+    SPOTIFY_TRUSTED_DECODING: bool = True
+    SPOTIFY_MARKET: str | None = "from_token"
+
+    # Spotify batch lookups
+    SPOTIFY_BATCH_MAX_IDS: int = 50
+    SPOTIFY_BATCH_CONCURRENCY: int = 8
+
+    # Spotify profile cache
+    SPOTIFY_PROFILE_CACHE_TTL: int = 300
+    SPOTIFY_PROFILE_CACHE_STALE_TTL: int = 3600
+    SPOTIFY_PROFILE_CACHE_MAX_ENTRIES: int = 10000
+
+    # Spotify tokens
+    SPOTIFY_TOKEN_REFRESH_MARGIN: int = 300
+    SPOTIFY_TOKEN_REFRESH_INTERVAL: float = 30.0
+    SPOTIFY_TOKEN_REFRESH_CONCURRENCY: int = 8
+    SPOTIFY_TOKEN_LOCK_MS: int = 10000
+    SPOTIFY_TOKEN_LOCAL_TTL: float = 30.0
+    SPOTIFY_TOKEN_LOCAL_MAX_ENTRIES: int = 10000
+
     # Redis
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_URL: str = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Values from this many bytes are compressed by CompressedCodec
+    REDIS_COMPRESSION_THRESHOLD: int = 1024
+    REDIS_COMPRESSION_LEVEL: int = 6
 
     # JWT
     JWT_SECRET_KEY: str
+    JWT_EXPIRES_IN: int = 30 * 24 * 3600
+    AUTH_TOKEN_CACHE_TTL: float = 30.0
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+
+    # Users
+    USERS_TOTAL_ESTIMATE_TTL: int = 60
+    USERS_PAGE_MAX: int = 100
+    FRIENDS_BATCH_MAX_IDS: int = 1000
+
+    # Repository cache
+    REPOSITORY_CACHE_TTL: int = 300
+    REPOSITORY_CACHE_NEGATIVE_TTL: int = 30
+    REPOSITORY_CACHE_JITTER: float = 0.1
+    # Bump when the layout of cached rows changes
+    REPOSITORY_CACHE_VERSION: int = 2
+
+    # Friend graph
+    FRIEND_GRAPH_TTL: int = 3600
+    FRIEND_SUGGESTIONS_SAMPLE: int = 200
+    FRIEND_SUGGESTIONS_MAX: int = 50
+    MUTUAL_FRIENDS_MAX: int = 100
+
+    # Presence
+    PRESENCE_TTL: int = 90
+    PRESENCE_FLUSH_INTERVAL: float = 5.0
+    PRESENCE_FLUSH_BATCH: int = 500
+    PRESENCE_ONLINE_MAX: int = 100
+
+    # Now playing fan-out
+    NOW_PLAYING_STATE_TTL: int = 3600
+    NOW_PLAYING_SEND_TIMEOUT: float = 5.0
+    NOW_PLAYING_KEEPALIVE: float = 15.0
+
+    # Playback poller
+    PLAYBACK_POLLER_ENABLED: bool = True
+    PLAYBACK_POLLER_CONCURRENCY: int = 20
+    PLAYBACK_POLLER_DISCOVERY_INTERVAL: float = 30.0
+    PLAYBACK_POLLER_MIN_INTERVAL: float = 2.0
+    PLAYBACK_POLLER_MAX_INTERVAL: float = 30.0
+    PLAYBACK_POLLER_IDLE_INTERVAL: float = 15.0
+    PLAYBACK_POLLER_IDLE_MAX_INTERVAL: float = 120.0
+    PLAYBACK_POLLER_LEADER_TTL: float = 90.0
+
+    # Password hashing
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_ROUNDS: int = 12
 
     class Config:
         env_file = Path(__file__).resolve().parent.parent.parent / ".env"
@@ -34,5 +131,8 @@ class Settings(BaseSettings):
     def get_database_url(self):
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    def get_async_database_url(self):
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
 
 GLOBAL_SETTINGS = Settings()
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+# Type definition for cached values
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded in-process LRU cache whose entries expire after a TTL.
+
+    Not thread safe, it is meant to be used from a single event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: Hashable) -> V | None:
+        """Returns the cached value, or None if missing or expired."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: float | None = None) -> None:
+        """Stores a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
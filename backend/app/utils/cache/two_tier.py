@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+from backend.app.utils.cache.lru import TTLCache
+from backend.app.utils.redis.codecs import JSON_CODEC, Codec
+from backend.app.utils.redis.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+# Type definition for cached values
+V = TypeVar("V")
+
+
+@dataclass
+class CacheEntry(Generic[V]):
+    value: V
+    fresh_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+
+class TwoTierCache(Generic[V]):
+    """
+    Read-through cache with an in-process LRU in front of a shared Redis tier.
+
+    Entries are fresh for ``ttl`` seconds and may then be served stale for
+    another ``stale_ttl`` seconds while a single background task refreshes
+    them (stale-while-revalidate).
+
+    Args:
+        redis: Shared Redis client
+        namespace: Prefix of every Redis key written by this cache
+        encode: Converts a value into a JSON-compatible object
+        decode: Rebuilds a value from its JSON-compatible form
+        ttl: Seconds an entry is considered fresh
+        stale_ttl: Extra seconds a stale entry may still be served
+        max_entries: Capacity of the in-process tier
+        codec: Representation of the entries in Redis
+    """
+
+    def __init__(
+        self,
+        redis: RedisConfig,
+        namespace: str,
+        encode: Callable[[V], Any],
+        decode: Callable[[Any], V],
+        ttl: float,
+        stale_ttl: float,
+        max_entries: int,
+        codec: Codec = JSON_CODEC,
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.codec = codec
+        self.local: TTLCache[CacheEntry[V]] = TTLCache(max_entries, ttl + stale_ttl)
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> CacheEntry[V] | None:
+        """Looks a key up in the local tier, then in Redis."""
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            payload = await self.redis.get(self._redis_key(key), self.codec)
+            if payload is None:
+                return None
+            entry = CacheEntry(self.decode(payload["value"]), payload["fresh_until"])
+        except Exception as e:
+            logger.warning(f"Dropping undecodable cache entry {key}: {e}")
+            await self.redis.delete(self._redis_key(key))
+            return None
+
+        self.local.set(
+            key, entry, max(entry.fresh_until - time.time(), 0) + self.stale_ttl
+        )
+        return entry
+
+    async def set(self, key: str, value: V) -> None:
+        """Stores a value in both tiers."""
+        entry = CacheEntry(value, time.time() + self.ttl)
+        self.local.set(key, entry)
+        await self.redis.set(
+            self._redis_key(key),
+            {"value": self.encode(value), "fresh_until": entry.fresh_until},
+            expire=int(self.ttl + self.stale_ttl),
+            codec=self.codec,
+        )
+
+    async def invalidate(self, key: str) -> None:
+        """Removes a key from both tiers."""
+        self.local.delete(key)
+        await self.redis.delete(self._redis_key(key))
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[V]]) -> V:
+        """
+        Returns the cached value for a key, fetching it on a miss.
+
+        Stale hits are returned immediately and refreshed in the background.
+        """
+        entry = await self.get(key)
+        if entry is None:
+            value = await fetch()
+            await self.set(key, value)
+            return value
+
+        if not entry.is_fresh:
+            self._schedule_refresh(key, fetch)
+        return entry.value
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], Awaitable[V]]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self.set(key, await fetch())
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
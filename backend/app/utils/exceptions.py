@@ -12,3 +12,15 @@ class EmailAlreadyExistsError(Exception):
 
 class PasswordNotStrongEnoughError(Exception):
     pass
+
+
+class PasswordHashingOverloadedError(Exception):
+    pass
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class InvalidTokenError(Exception):
+    pass
@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+
+from backend.app.utils.exceptions import InvalidCursorError
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """
+    Encodes a keyset position into an opaque cursor.
+
+    Args:
+        created_at: Creation date of the last row returned
+        id: ID of the last row returned
+
+    Returns:
+        str: URL-safe cursor pointing right after that row
+    """
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Decodes a cursor produced by ``encode_cursor``.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
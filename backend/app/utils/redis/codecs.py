@@ -0,0 +1,94 @@
+import json
+import zlib
+from typing import Any, Protocol
+
+from backend.app.settings import GLOBAL_SETTINGS
+
+"""
+Codecs turning cached values into the bytes stored in Redis.
+"""
+
+
+class Codec(Protocol):
+    """Converts values to and from their Redis representation."""
+
+    def encode(self, value: Any) -> bytes: ...
+
+    def decode(self, data: bytes) -> Any: ...
+
+
+class JsonCodec:
+    """
+    Compact JSON, readable by any client.
+
+    Values written before codecs existed are plain JSON and decode as well.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """
+    MessagePack, smaller and faster to decode than JSON for numeric payloads.
+
+    Requires the optional msgpack extra (`pip install syncify-backend[msgpack]`).
+    """
+
+    def __init__(self) -> None:
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError(
+                "MsgpackCodec requires the msgpack extra: syncify-backend[msgpack]"
+            ) from e
+        self._msgpack = msgpack
+
+    def encode(self, value: Any) -> bytes:
+        packed: bytes = self._msgpack.packb(value, use_bin_type=True)
+        return packed
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class CompressedCodec:
+    """
+    Wraps a codec and zlib-compresses values of at least ``threshold`` bytes.
+
+    Each value is prefixed with a byte telling whether it is compressed, small
+    values are stored as they are since compressing them saves nothing.
+    """
+
+    _PLAIN = b"\x00"
+    _ZLIB = b"\x01"
+
+    def __init__(
+        self,
+        codec: Codec,
+        threshold: int = GLOBAL_SETTINGS.REDIS_COMPRESSION_THRESHOLD,
+        level: int = GLOBAL_SETTINGS.REDIS_COMPRESSION_LEVEL,
+    ):
+        self.codec = codec
+        self.threshold = threshold
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.encode(value)
+        if len(data) < self.threshold:
+            return self._PLAIN + data
+        return self._ZLIB + zlib.compress(data, self.level)
+
+    def decode(self, data: bytes) -> Any:
+        marker, payload = data[:1], data[1:]
+        if marker == self._ZLIB:
+            payload = zlib.decompress(payload)
+        elif marker != self._PLAIN:
+            raise ValueError("Value was not written by a CompressedCodec")
+        return self.codec.decode(payload)
+
+
+JSON_CODEC = JsonCodec()
@@ -1,58 +1,269 @@
-import redis
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any, AsyncIterator, Iterable, Mapping
+
+from fastapi import Request
+from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+from redis.typing import EncodableT, KeyT
 import logging
-import json
 
 from backend.app.settings import GLOBAL_SETTINGS
+from backend.app.utils.redis.codecs import JSON_CODEC, Codec
 
 logger = logging.getLogger(__name__)
 
 
+def _binary_client(connection: aioredis.Redis) -> aioredis.Redis:
+    """Builds a client on a copy of a client's pool that keeps replies as bytes."""
+    pool = connection.connection_pool
+    return aioredis.Redis(
+        connection_pool=type(pool)(
+            connection_class=pool.connection_class,
+            max_connections=pool.max_connections,
+            **{**pool.connection_kwargs, "decode_responses": False},
+        )
+    )
+
+
 class RedisConfig:
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.connection = None
-        return cls._instance
-
-    def __init__(self):
-        if not hasattr(self, "connection"):
-            self.connection = None
-
-    def init_connection(self):
-        if self.connection is None:
-            self.connection = redis.Redis.from_url(
-                url=GLOBAL_SETTINGS.REDIS_URL, decode_responses=True
-            )
-            logger.info("Redis connection established.")
+    """
+    Async Redis client backed by an explicit connection pool.
+
+    A single instance is created in the application lifespan and shared by
+    every request through the ``get_redis`` dependency.
 
-    def close_connection(self):
-        """Closes the Redis connection."""
-        self.connection.close()
+    ``connection`` decodes replies to strings, for the commands callers run
+    directly. Values read and written through the helpers go through a
+    ``Codec`` on a second pool, ``binary``, which returns raw bytes so codecs
+    are free to store binary or compressed data.
+    """
 
-    def set_key(self, key: str, value: str, expire: int = None) -> bool:
+    def __init__(
+        self,
+        connection: aioredis.Redis,
+        codec: Codec = JSON_CODEC,
+        binary: aioredis.Redis | None = None,
+    ):
+        self.connection = connection
+        self.codec = codec
+        self.binary = binary if binary is not None else _binary_client(connection)
+
+    @classmethod
+    def from_settings(cls) -> "RedisConfig":
+        """Builds a pooled client configured from the global settings."""
+        pool = aioredis.ConnectionPool.from_url(
+            GLOBAL_SETTINGS.REDIS_URL,
+            max_connections=GLOBAL_SETTINGS.REDIS_MAX_CONNECTIONS,
+            socket_timeout=GLOBAL_SETTINGS.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=GLOBAL_SETTINGS.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=GLOBAL_SETTINGS.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True,
+        )
+        logger.info("Redis connection pool created.")
+        return cls(aioredis.Redis(connection_pool=pool))
+
+    async def close_connection(self) -> None:
+        """Closes the clients and every pooled connection."""
+        for client in (self.connection, self.binary):
+            await client.aclose()
+            await client.connection_pool.disconnect()
+        logger.info("Redis connection pool closed.")
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: int | None = None,
+        codec: Codec | None = None,
+    ) -> bool:
         """Sets a key in Redis with an optional expiration time."""
         try:
-            self.connection.set(name=key, value=json.dumps(value), ex=expire)
+            await self.binary.set(
+                name=key, value=(codec or self.codec).encode(value), ex=expire
+            )
             return True
-        except redis.RedisError as e:
-            print(f"Error setting key in Redis: {e}")
+        except RedisError as e:
+            logger.error(f"Error setting key in Redis: {e}")
             return False
 
-    def get_key(self, key: str) -> str | None:
+    async def get(self, key: str, codec: Codec | None = None) -> Any | None:
         """Gets a value for a given key from Redis."""
         try:
-            return json.loads(self.connection.get(name=key))
-        except redis.RedisError as e:
-            print(f"Error getting key from Redis: {e}")
+            value = await self.binary.get(name=key)
+            return (codec or self.codec).decode(value) if value is not None else None
+        except RedisError as e:
+            logger.error(f"Error getting key from Redis: {e}")
             return None
 
-    def delete_key(self, key: str) -> bool:
-        """Deletes a key from Redis."""
+    async def mget(
+        self, keys: Iterable[str], codec: Codec | None = None
+    ) -> list[Any | None]:
+        """
+        Gets the values of many keys in one round trip.
+
+        Returns:
+            list[Any | None]: Values in the order of the keys, None if missing
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+        codec = codec or self.codec
+        try:
+            values = await self.binary.mget(keys)
+        except RedisError as e:
+            logger.error(f"Error getting keys from Redis: {e}")
+            return [None] * len(keys)
+        return [codec.decode(value) if value is not None else None for value in values]
+
+    async def mset(
+        self,
+        values: Mapping[str, Any],
+        expire: int | None = None,
+        codec: Codec | None = None,
+    ) -> bool:
+        """
+        Sets many keys in one round trip.
+
+        MSET cannot expire keys, with an expiration time the keys are set by
+        pipelined SET commands instead.
+        """
+        if not values:
+            return True
+        codec = codec or self.codec
+        encoded: dict[KeyT, EncodableT] = {
+            key: codec.encode(value) for key, value in values.items()
+        }
+        try:
+            if expire is None:
+                await self.binary.mset(encoded)
+            else:
+                async with self.pipeline(binary=True) as pipe:
+                    for key, value in encoded.items():
+                        pipe.set(key, value, ex=expire)
+            return True
+        except RedisError as e:
+            logger.error(f"Error setting keys in Redis: {e}")
+            return False
+
+    async def hset(
+        self,
+        key: str,
+        fields: Mapping[str, Any],
+        expire: int | None = None,
+        codec: Codec | None = None,
+    ) -> bool:
+        """Sets fields of a hash, optionally (re)setting its expiration time."""
+        if not fields:
+            return True
+        codec = codec or self.codec
+        try:
+            async with self.pipeline(transaction=True, binary=True) as pipe:
+                pipe.hset(
+                    key,
+                    mapping={
+                        field: codec.encode(value) for field, value in fields.items()
+                    },
+                )
+                if expire is not None:
+                    pipe.expire(key, expire)
+            return True
+        except RedisError as e:
+            logger.error(f"Error setting hash fields in Redis: {e}")
+            return False
+
+    async def hmget(
+        self, key: str, fields: Iterable[str], codec: Codec | None = None
+    ) -> dict[str, Any]:
+        """
+        Gets fields of a hash in one round trip.
+
+        Returns:
+            dict[str, Any]: Values by field, missing fields omitted
+        """
+        fields = list(fields)
+        if not fields:
+            return {}
+        codec = codec or self.codec
+        try:
+            values = await self.binary.hmget(key, fields)
+        except RedisError as e:
+            logger.error(f"Error getting hash fields from Redis: {e}")
+            return {}
+        return {
+            field: codec.decode(value)
+            for field, value in zip(fields, values, strict=True)
+            if value is not None
+        }
+
+    async def hgetall(self, key: str, codec: Codec | None = None) -> dict[str, Any]:
+        """Gets every field of a hash, an empty dict if it does not exist."""
+        codec = codec or self.codec
+        try:
+            values = await self.binary.hgetall(key)
+        except RedisError as e:
+            logger.error(f"Error getting hash from Redis: {e}")
+            return {}
+        return {
+            field.decode("utf-8"): codec.decode(value)
+            for field, value in values.items()
+        }
+
+    async def hdel(self, key: str, *fields: str) -> bool:
+        """Deletes fields of a hash."""
+        try:
+            await self.connection.hdel(key, *fields)
+            return True
+        except RedisError as e:
+            logger.error(f"Error deleting hash fields from Redis: {e}")
+            return False
+
+    async def delete(self, *keys: str) -> bool:
+        """Deletes one or more keys from Redis."""
         try:
-            self.connection.delete(key)
+            await self.connection.delete(*keys)
             return True
-        except redis.RedisError as e:
-            print(f"Error deleting key from Redis: {e}")
+        except RedisError as e:
+            logger.error(f"Error deleting key from Redis: {e}")
             return False
+
+    @asynccontextmanager
+    async def pipeline(
+        self, transaction: bool = False, binary: bool = False
+    ) -> AsyncIterator[Pipeline]:
+        """
+        Batches commands into a single round trip.
+
+        Commands still queued when the block exits are executed automatically,
+        callers that need the replies can ``await pipe.execute()`` themselves.
+
+        Args:
+            transaction: Wraps the batch in MULTI/EXEC when True
+            binary: Runs on the client returning raw bytes, for coded values
+        """
+        client = self.binary if binary else self.connection
+        async with client.pipeline(transaction=transaction) as pipe:
+            yield pipe
+            if len(pipe):
+                await pipe.execute()
+
+    def transaction(
+        self, binary: bool = False
+    ) -> AbstractAsyncContextManager[Pipeline]:
+        """
+        Batches commands into a single MULTI/EXEC round trip.
+
+        Shorthand for ``pipeline(transaction=True)``, the commands of the
+        block are applied atomically.
+        """
+        return self.pipeline(transaction=True, binary=binary)
+
+
+def get_redis(request: Request) -> RedisConfig:
+    """
+    Provides the Redis client created in the application lifespan.
+
+    Returns:
+        RedisConfig: The process-wide Redis client
+    """
+    return request.app.state.redis
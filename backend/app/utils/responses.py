@@ -0,0 +1,28 @@
+from typing import Mapping
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    """
+    JSON response holding a model encoded straight to bytes by pydantic-core.
+
+    Returned from a route, it skips FastAPI's response handling: the model is
+    not validated against ``response_model`` again nor turned into a dict by
+    ``jsonable_encoder`` before being encoded. ``response_model`` is still
+    declared on the route for the OpenAPI schema, so the model returned must
+    be an instance of it.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        model: BaseModel,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ):
+        super().__init__(
+            model.__pydantic_serializer__.to_json(model), status_code, headers
+        )
@@ -0,0 +1,490 @@
+"""
+Load tests the API end to end with scripted user journeys.
+
+Boots the application in process, lifespan included, against the configured
+PostgreSQL and Redis (or fakeredis with ``--fake-redis``), with Spotify
+replaced by a mock answering after ``--spotify-latency-ms``. Test accounts
+are created through the API, then ``--concurrency`` virtual users run
+weighted journeys (browsing users, account and presence, friends, Spotify
+profiles) for ``--duration`` seconds, and the accounts are deleted.
+
+Requests go through an in-process ASGI transport: latencies include the
+whole application but no network, compare runs made on the same machine.
+The report, printed as JSON or written to ``--output`` to serve as a
+baseline, gives the throughput and, per route, the p50/p95/p99 latencies.
+
+Usage (from the repository root, with the migrations applied):
+
+    python -m backend.benchmarks.load_test --concurrency 20 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Coroutine
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from backend.app.services.spotify_api.schemas.token import SpotifyToken
+from backend.app.utils.redis.redis_config import RedisConfig
+
+PASSWORD = "Load-test-passw0rd!"
+
+
+@dataclass
+class Account:
+    id: str
+    display_name: str
+    email: str
+    spotify_id: str
+    bearer_token: str = ""
+
+    @property
+    def spotify_token(self) -> str:
+        return f"token-{self.spotify_id}"
+
+
+class Recorder:
+    """Collects latencies and errors per route."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        route: str,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Sends a request, recorded under ``route`` once recording started.
+
+        Statuses from 400 count as errors.
+        """
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.recording:
+            self.latencies[route].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            routes[route] = {
+                "requests": len(latencies),
+                "errors": self.errors[route],
+                "throughput_rps": round(len(latencies) / duration, 1),
+                "p50_ms": _percentile(latencies, 0.50),
+                "p95_ms": _percentile(latencies, 0.95),
+                "p99_ms": _percentile(latencies, 0.99),
+                "max_ms": round(latencies[-1], 2),
+            }
+        requests = sum(route["requests"] for route in routes.values())
+        return {
+            "duration_s": round(duration, 2),
+            "requests": requests,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(requests / duration, 1),
+            "routes": routes,
+        }
+
+
+def _percentile(sorted_values: list[float], quantile: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(math.ceil(quantile * len(sorted_values)) - 1, 0)
+    return round(sorted_values[rank], 2)
+
+
+# Journeys, each run by a virtual user on behalf of its own account
+
+
+Journey = Callable[
+    [httpx.AsyncClient, Recorder, Account, list[Account], random.Random],
+    Awaitable[None],
+]
+
+
+async def browse(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    _me: Account,
+    others: list[Account],
+    rng: random.Random,
+) -> None:
+    """Lists users, follows the cursor once and opens a profile."""
+    page = await recorder.request(
+        client, "GET /users/", "GET", "/users/", params={"per_page": 20}
+    )
+    cursor = page.json().get("next_cursor") if page.status_code == 200 else None
+    if cursor:
+        await recorder.request(
+            client,
+            "GET /users/?cursor",
+            "GET",
+            "/users/",
+            params={"per_page": 20, "cursor": cursor},
+        )
+    await recorder.request(
+        client,
+        "GET /users/{username}",
+        "GET",
+        f"/users/{rng.choice(others).display_name}",
+    )
+
+
+async def account(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    me: Account,
+    _others: list[Account],
+    rng: random.Random,
+) -> None:
+    """Logs in, reads the own account and sends a presence heartbeat."""
+    login = await recorder.request(
+        client,
+        "POST /users/login",
+        "POST",
+        "/users/login",
+        json={"email": me.email, "password": PASSWORD},
+    )
+    if login.status_code == 200:
+        me.bearer_token = login.json()["access_token"]
+    await recorder.request(
+        client,
+        "GET /users/me",
+        "GET",
+        "/users/me",
+        headers={"Authorization": f"Bearer {me.bearer_token}"},
+    )
+    await recorder.request(
+        client,
+        "PUT /users/{user_id}/presence",
+        "PUT",
+        f"/users/{me.id}/presence",
+        json={"currently_playing": f"Track {rng.randrange(100)}"},
+    )
+    await recorder.request(
+        client, "GET /users/presence/online", "GET", "/users/presence/online"
+    )
+
+
+async def social(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    me: Account,
+    others: list[Account],
+    rng: random.Random,
+) -> None:
+    """Adds a friend, looks at mutual friends and suggestions, unfriends."""
+    friend = rng.choice(others)
+    await recorder.request(
+        client,
+        "POST /users/{user_id}/friends/{friend_id}",
+        "POST",
+        f"/users/{me.id}/friends/{friend.id}",
+    )
+    await recorder.request(
+        client,
+        "GET /users/{user_id}/friends/mutual/{other_id}",
+        "GET",
+        f"/users/{me.id}/friends/mutual/{friend.id}",
+    )
+    await recorder.request(
+        client,
+        "GET /users/{user_id}/suggestions",
+        "GET",
+        f"/users/{me.id}/suggestions",
+    )
+    await recorder.request(
+        client,
+        "DELETE /users/{user_id}/friends/{friend_id}",
+        "DELETE",
+        f"/users/{me.id}/friends/{friend.id}",
+    )
+
+
+async def spotify(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    me: Account,
+    others: list[Account],
+    rng: random.Random,
+) -> None:
+    """Reads Spotify profiles, one by one and batched, and the own token."""
+    token = me.spotify_token
+    await recorder.request(
+        client, "GET /spotify/user", "GET", "/spotify/user", params={"token": token}
+    )
+    await recorder.request(
+        client,
+        "GET /spotify/user/{user_id}",
+        "GET",
+        f"/spotify/user/{rng.choice(others).spotify_id}",
+        params={"token": token},
+    )
+    ids = [other.spotify_id for other in rng.sample(others, min(5, len(others)))]
+    await recorder.request(
+        client,
+        "GET /spotify/users",
+        "GET",
+        "/spotify/users",
+        params={"token": token, "ids": ",".join(ids)},
+    )
+    await recorder.request(
+        client,
+        "GET /spotify/token",
+        "GET",
+        "/spotify/token",
+        params={"user_id": me.spotify_id},
+    )
+
+
+# Relative frequency of each journey
+JOURNEYS: dict[str, tuple[Journey, int]] = {
+    "browse": (browse, 4),
+    "account": (account, 1),
+    "social": (social, 2),
+    "spotify": (spotify, 3),
+}
+
+
+def _spotify_handler(
+    latency: float,
+) -> Callable[[httpx.Request], Coroutine[None, None, httpx.Response]]:
+    """Answers the Spotify Web API calls made by the application."""
+
+    def profile(spotify_id: str) -> dict:
+        return {
+            "id": spotify_id,
+            "display_name": spotify_id.upper(),
+            "type": "user",
+            "uri": f"spotify:user:{spotify_id}",
+            "href": f"https://api.spotify.com/v1/users/{spotify_id}",
+            "external_urls": {"spotify": f"https://open.spotify.com/user/{spotify_id}"},
+            "images": [],
+        }
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        path = request.url.path
+        if path.startswith("/v1/me/player"):
+            return httpx.Response(204)
+        if path == "/v1/me":
+            token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            return httpx.Response(200, json=profile(token.removeprefix("token-")))
+        if path.startswith("/v1/users/"):
+            return httpx.Response(200, json=profile(path.rsplit("/", 1)[1]))
+        return httpx.Response(404, json={"error": {"status": 404}})
+
+    return handle
+
+
+def _fake_redis(cls: type[RedisConfig]) -> RedisConfig:
+    try:
+        import fakeredis
+    except ImportError as e:
+        raise SystemExit("--fake-redis requires the fakeredis package") from e
+    return cls(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+async def _gather_bounded(calls: list[Awaitable], limit: int = 10) -> list:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(call: Awaitable) -> Any:
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*(bounded(call) for call in calls))
+
+
+async def _setup(
+    app: FastAPI, client: httpx.AsyncClient, run_id: str, count: int
+) -> list[Account]:
+    """Creates the test accounts, logs them in and stores their Spotify token."""
+
+    async def create(i: int) -> Account:
+        name = f"load{run_id}u{i}"
+        response = await client.post(
+            "/users/",
+            json={
+                "display_name": name,
+                "email": f"{name}@example.com",
+                "password": PASSWORD,
+                "spotify_id": f"load{run_id}sp{i}",
+            },
+        )
+        response.raise_for_status()
+        user = response.json()
+        test_account = Account(user["id"], name, user["email"], user["spotify_id"])
+        login = await client.post(
+            "/users/login", json={"email": test_account.email, "password": PASSWORD}
+        )
+        login.raise_for_status()
+        test_account.bearer_token = login.json()["access_token"]
+        await app.state.spotify_tokens.store(
+            test_account.spotify_id,
+            SpotifyToken(
+                access_token=test_account.spotify_token,
+                refresh_token="load-test",
+                expires_in=3600,
+            ),
+        )
+        return test_account
+
+    return await _gather_bounded([create(i) for i in range(count)])
+
+
+async def _teardown(
+    app: FastAPI, client: httpx.AsyncClient, accounts: list[Account]
+) -> None:
+    """Deletes the test accounts and their Spotify tokens."""
+
+    async def delete(test_account: Account) -> None:
+        await client.delete(f"/users/{test_account.id}")
+        await app.state.spotify_tokens.invalidate(test_account.spotify_id)
+
+    await _gather_bounded([delete(test_account) for test_account in accounts])
+
+
+async def _virtual_user(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    me: Account,
+    others: list[Account],
+    journeys: list[str],
+    deadline: float,
+    rng: random.Random,
+) -> None:
+    weights = [JOURNEYS[name][1] for name in journeys]
+    while time.monotonic() < deadline:
+        (name,) = rng.choices(journeys, weights)
+        await JOURNEYS[name][0](client, recorder, me, others, rng)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Boots the application, drives the journeys and returns the report."""
+    from backend.app.main import app
+
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    with ExitStack() as stack:
+        if args.fake_redis:
+            stack.enter_context(
+                patch.object(RedisConfig, "from_settings", classmethod(_fake_redis))
+            )
+
+        async with app.router.lifespan_context(app):
+            spotify_client = app.state.spotify_client
+            await spotify_client.http_client.aclose()
+            spotify_client.http_client = httpx.AsyncClient(
+                transport=httpx.MockTransport(
+                    _spotify_handler(args.spotify_latency_ms / 1000)
+                )
+            )
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load-test", timeout=60
+            ) as client:
+                # Each virtual user owns an account, friendships never collide
+                accounts = await _setup(
+                    app, client, run_id, max(args.users, args.concurrency + 1)
+                )
+                try:
+
+                    async def drive(seconds: float) -> None:
+                        deadline = time.monotonic() + seconds
+                        await asyncio.gather(
+                            *(
+                                _virtual_user(
+                                    client,
+                                    recorder,
+                                    accounts[i],
+                                    accounts[:i] + accounts[i + 1 :],
+                                    args.journeys,
+                                    deadline,
+                                    random.Random(rng.random()),
+                                )
+                                for i in range(args.concurrency)
+                            )
+                        )
+
+                    await drive(args.warmup)
+                    recorder.recording = True
+                    start = time.monotonic()
+                    await drive(args.duration)
+                    duration = time.monotonic() - start
+                    recorder.recording = False
+                finally:
+                    await _teardown(app, client, accounts)
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "users": len(accounts),
+            "journeys": {name: JOURNEYS[name][1] for name in args.journeys},
+            "warmup_s": args.warmup,
+            "spotify_latency_ms": args.spotify_latency_ms,
+            "redis": "fakeredis" if args.fake_redis else "configured",
+            "seed": args.seed,
+        },
+        **recorder.report(duration),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument(
+        "--journeys",
+        type=lambda value: value.split(","),
+        default=list(JOURNEYS),
+        help=f"Comma separated, among {', '.join(JOURNEYS)}",
+    )
+    parser.add_argument("--spotify-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--fake-redis", action="store_true", help="Use fakeredis instead of Redis"
+    )
+    parser.add_argument("--output", help="Writes the report to this file")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Keep the application's info logs"
+    )
+    args = parser.parse_args()
+    unknown = set(args.journeys) - JOURNEYS.keys()
+    if unknown:
+        parser.error(f"Unknown journeys: {', '.join(sorted(unknown))}")
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
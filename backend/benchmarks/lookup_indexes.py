@@ -0,0 +1,169 @@
+"""
+Measures user lookups with and without the lookup indexes.
+
+Builds a scratch copy of ``users`` and ``friends_association`` in its own
+schema, fills it with generated rows, then times the queries issued by
+``UserRepository`` before and after creating the indexes of revision
+b3f8d1e6a027. Results are printed as JSON.
+
+Usage (from the repository root, against the configured PostgreSQL):
+
+    python -m backend.benchmarks.lookup_indexes --rows 1000000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from backend.app.settings import GLOBAL_SETTINGS
+
+SCHEMA = "bench_lookup_indexes"
+
+SETUP = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    f"""
+    CREATE TABLE {SCHEMA}.users (
+        id varchar(36) PRIMARY KEY,
+        spotify_id varchar(255),
+        display_name varchar(255) NOT NULL,
+        email varchar(255) NOT NULL,
+        password_hash varchar(255) NOT NULL,
+        created_at timestamp NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE {SCHEMA}.friends_association (
+        user_id varchar(36) NOT NULL REFERENCES {SCHEMA}.users (id),
+        friend_id varchar(36) NOT NULL REFERENCES {SCHEMA}.users (id),
+        PRIMARY KEY (user_id, friend_id)
+    )
+    """,
+    f"""
+    INSERT INTO {SCHEMA}.users
+    SELECT md5(i::text), 'spotify' || i, 'User' || i, 'user' || i || '@example.com',
+           'x', now() - i * interval '1 second'
+    FROM generate_series(1, :rows) AS i
+    """,
+    f"""
+    INSERT INTO {SCHEMA}.friends_association
+    SELECT md5(i::text), md5((((i::bigint * 7919) % :rows) + 1)::text)
+    FROM generate_series(1, :rows) AS i
+    WHERE ((i::bigint * 7919) % :rows) + 1 <> i
+    """,
+]
+
+INDEXES = [
+    f"CREATE UNIQUE INDEX uq_users_lower_email ON {SCHEMA}.users (lower(email))",
+    f"CREATE UNIQUE INDEX uq_users_lower_display_name "
+    f"ON {SCHEMA}.users (lower(display_name))",
+    f"CREATE INDEX ix_users_spotify_id ON {SCHEMA}.users (spotify_id)",
+    f"CREATE INDEX ix_friends_association_friend_id "
+    f"ON {SCHEMA}.friends_association (friend_id, user_id)",
+]
+
+# Lookups as issued by UserRepository, keyed by the generated row number
+QUERIES = {
+    "get_by_email": (
+        f"SELECT * FROM {SCHEMA}.users WHERE lower(email) = lower(:value)",
+        lambda i: f"User{i}@Example.com",
+    ),
+    "get_by_display_name": (
+        f"SELECT * FROM {SCHEMA}.users " f"WHERE lower(display_name) = lower(:value)",
+        lambda i: f"user{i}",
+    ),
+    "get_by_spotify_id": (
+        f"SELECT * FROM {SCHEMA}.users WHERE spotify_id = :value",
+        lambda i: f"spotify{i}",
+    ),
+    "friended_by": (
+        f"SELECT u.* FROM {SCHEMA}.users u "
+        f"JOIN {SCHEMA}.friends_association f ON f.user_id = u.id "
+        f"WHERE f.friend_id = md5(:value)",
+        lambda i: str(i),
+    ),
+}
+
+
+def measure(connection: Connection, rows: int, repeat: int) -> dict:
+    """Times every query against random rows and records its top plan node."""
+    results = {}
+    for name, (sql, make_value) in QUERIES.items():
+        statement = text(sql)
+        plan = connection.execute(
+            text(f"EXPLAIN (FORMAT JSON) {sql}"), {"value": make_value(1)}
+        ).scalar_one()
+        durations = []
+        for _ in range(repeat):
+            value = make_value(random.randint(1, rows))
+            start = time.perf_counter()
+            connection.execute(statement, {"value": value}).all()
+            durations.append((time.perf_counter() - start) * 1000)
+        durations.sort()
+        results[name] = {
+            "plan": _scan_types(plan[0]["Plan"]),
+            "p50_ms": round(statistics.median(durations), 3),
+            "p95_ms": round(durations[int(len(durations) * 0.95) - 1], 3),
+        }
+    return results
+
+
+def _scan_types(node: dict) -> list[str]:
+    scans = [node["Node Type"]] if "Scan" in node["Node Type"] else []
+    for child in node.get("Plans", []):
+        scans.extend(_scan_types(child))
+    return scans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch schema afterwards"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(GLOBAL_SETTINGS.get_database_url())
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        start = time.perf_counter()
+        for sql in SETUP:
+            conn.execute(text(sql), {"rows": args.rows})
+        conn.execute(text(f"ANALYZE {SCHEMA}.users, {SCHEMA}.friends_association"))
+        setup_seconds = time.perf_counter() - start
+
+        before = measure(conn, args.rows, args.repeat)
+
+        start = time.perf_counter()
+        for sql in INDEXES:
+            conn.execute(text(sql))
+        conn.execute(text(f"ANALYZE {SCHEMA}.users, {SCHEMA}.friends_association"))
+        index_seconds = time.perf_counter() - start
+
+        after = measure(conn, args.rows, args.repeat)
+
+        if not args.keep:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+    print(
+        json.dumps(
+            {
+                "rows": args.rows,
+                "repeat": args.repeat,
+                "setup_seconds": round(setup_seconds, 1),
+                "index_build_seconds": round(index_seconds, 1),
+                "before": before,
+                "after": after,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Compares the ways of decoding large Spotify payloads.
+
+Times, per payload, today's ``Model(**response.json())`` path against
+``Model.model_validate_json`` and the cached ``decode`` fast path, with and
+without trusted mode, then validation alone on an already parsed payload,
+and finally the now playing projection against a full playback. Timings
+are noisy on shared machines, compare ``min_ms`` first.
+
+Payloads are generated with the size of real responses: every track and
+album lists the ~185 markets Spotify serves and carries three images.
+Results are printed as JSON.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.spotify_decoding --repeat 500
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from backend.app.services.spotify_api.schemas.album import Album
+from backend.app.services.spotify_api.schemas.decoding import decode, trusted_model
+from backend.app.services.spotify_api.schemas.player import CurrentlyPlaying
+from backend.app.services.users.now_playing import NOW_PLAYING_PROJECTION
+
+MARKETS = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(185)]
+
+
+def _url(path: str) -> str:
+    return f"https://open.spotify.com/{path}"
+
+
+def _images(seed: str) -> list[dict]:
+    return [
+        {"url": f"https://i.scdn.co/image/{seed}{size}", "height": size, "width": size}
+        for size in (640, 300, 64)
+    ]
+
+
+def _artist(i: int) -> dict:
+    return {
+        "external_urls": {"spotify": _url(f"artist/{i}")},
+        "href": f"https://api.spotify.com/v1/artists/{i}",
+        "id": f"artist{i}",
+        "name": f"Artist {i}",
+        "type": "artist",
+        "uri": f"spotify:artist:{i}",
+    }
+
+
+def _track(i: int, album: dict | None = None) -> dict:
+    track = {
+        "artists": [_artist(i), _artist(i + 1)],
+        "available_markets": MARKETS,
+        "disc_number": 1,
+        "duration_ms": 200_000 + i,
+        "explicit": False,
+        "external_urls": {"spotify": _url(f"track/{i}")},
+        "href": f"https://api.spotify.com/v1/tracks/{i}",
+        "id": f"track{i}",
+        "is_playable": True,
+        "name": f"Track {i}",
+        "popularity": 50,
+        "preview_url": f"https://p.scdn.co/mp3-preview/{i}",
+        "track_number": i,
+        "type": "track",
+        "uri": f"spotify:track:{i}",
+        "is_local": False,
+    }
+    if album is not None:
+        track["album"] = album
+    return track
+
+
+def _album(tracks: int) -> dict:
+    return {
+        "album_type": "album",
+        "total_tracks": tracks,
+        "available_markets": MARKETS,
+        "external_urls": {"spotify": _url("album/1")},
+        "href": "https://api.spotify.com/v1/albums/1",
+        "id": "album1",
+        "images": _images("album"),
+        "name": "Album",
+        "release_date": "2024-01-01",
+        "release_date_precision": "day",
+        "type": "album",
+        "uri": "spotify:album:1",
+        "artists": [_artist(0)],
+        "tracks": {
+            "href": "https://api.spotify.com/v1/albums/1/tracks",
+            "limit": tracks,
+            "next": None,
+            "offset": 0,
+            "previous": None,
+            "total": tracks,
+            "items": [_track(i) for i in range(tracks)],
+        },
+        "copyrights": [{"text": "(C) Label", "type": "C"}],
+        "external_ids": {"upc": "000000000000"},
+        "genres": [],
+        "label": "Label",
+        "popularity": 50,
+    }
+
+
+def _currently_playing() -> dict:
+    album = _album(0)
+    del album["tracks"]
+    return {
+        "device": {
+            "id": "device",
+            "is_active": True,
+            "name": "Phone",
+            "type": "Smartphone",
+        },
+        "repeat_state": "off",
+        "shuffle_state": False,
+        "context": {"type": "album", "external_urls": {"spotify": _url("album/1")}},
+        "timestamp": 1_700_000_000_000,
+        "progress_ms": 42_000,
+        "is_playing": True,
+        "item": _track(1, album),
+        "currently_playing_type": "track",
+        "actions": {"pausing": True},
+    }
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> dict:
+    fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "min_ms": round(durations[0], 4),
+        "p50_ms": round(statistics.median(durations), 4),
+        "p95_ms": round(durations[int(len(durations) * 0.95) - 1], 4),
+    }
+
+
+def measure(model: type[BaseModel], body: bytes, repeat: int) -> dict:
+    """Times every decoding path of one payload, then validation alone."""
+    parsed = json.loads(body)
+    trusted = trusted_model(model)
+    results: dict[str, Any] = {
+        "bytes": len(body),
+        "model_kwargs": _time(lambda: model(**json.loads(body)), repeat),
+        "model_validate_json": _time(lambda: model.model_validate_json(body), repeat),
+        "decode_validated": _time(lambda: decode(model, body, trusted=False), repeat),
+        "decode_trusted": _time(lambda: decode(model, body, trusted=True), repeat),
+        "validation_only": {
+            "model_kwargs": _time(lambda: model(**parsed), repeat),
+            "trusted": _time(lambda: trusted.model_validate(parsed), repeat),
+        },
+    }
+    results["speedup"] = round(
+        results["model_kwargs"]["min_ms"] / results["decode_trusted"]["min_ms"], 2
+    )
+    return results
+
+
+def measure_projection(body: bytes, repeat: int) -> dict:
+    """
+    Times the now playing projection against the full currently playing path.
+
+    The projected body stands for what Spotify returns when asked for those
+    fields only, in a market, so without ``available_markets``.
+    """
+    projection = NOW_PLAYING_PROJECTION
+    projected = json.dumps(
+        decode(projection.model, body).model_dump(exclude_none=True)
+    ).encode()
+    return {
+        "fields": projection.fields,
+        "bytes": len(projected),
+        "decode_full_response": _time(
+            lambda: decode(projection.model, body, trusted=True), repeat
+        ),
+        "decode_projected_response": _time(
+            lambda: decode(projection.model, projected, trusted=True), repeat
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--album-tracks", type=int, default=50)
+    args = parser.parse_args()
+
+    currently_playing = json.dumps(_currently_playing()).encode()
+    payloads: dict[str, tuple[type[BaseModel], dict]] = {
+        "currently_playing": (CurrentlyPlaying, _currently_playing()),
+        "album": (Album, _album(args.album_tracks)),
+    }
+    print(
+        json.dumps(
+            {
+                "repeat": args.repeat,
+                "payloads": {
+                    name: measure(model, json.dumps(payload).encode(), args.repeat)
+                    for name, (model, payload) in payloads.items()
+                },
+                "now_playing_projection": measure_projection(
+                    currently_playing, args.repeat
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares the ways of serializing a page of users.
+
+Times ``GET /users/``'s former path, where each row is validated into a
+``UserOut``, then the page again against ``response_model`` before going
+through ``jsonable_encoder`` and ``json.dumps``, against ``UserOut.from_user``
+building models without validation and ``ModelResponse`` encoding them
+straight to bytes. Both produce the same body, which is checked first.
+Timings are noisy on shared machines, compare ``min_ms`` first. Results are
+printed as JSON.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.user_serialization --repeat 500
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from backend.app.models.users import PaginatedUsers, User, UserOut
+from backend.app.utils.responses import ModelResponse
+
+PAGE_FIELD = create_model_field("Response", PaginatedUsers, mode="serialization")
+
+LOOP = asyncio.new_event_loop()
+
+
+def _users(count: int) -> list[User]:
+    created_at = datetime(2024, 1, 1)
+    return [
+        User(
+            id=f"00000000-0000-4000-8000-{i:012d}",
+            spotify_id=f"spotify{i}",
+            country="FR",
+            display_name=f"user{i}",
+            email=f"user{i}@example.com",
+            avatar=f"https://i.scdn.co/image/{i}",
+            currently_playing=f"Track {i}" if i % 3 else None,
+            password_hash="$2b$12$" + "x" * 53,
+            created_at=created_at + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def _page(users: list[UserOut]) -> PaginatedUsers:
+    return PaginatedUsers(
+        total=10_000, users=users, page=1, per_page=len(users), pages=100
+    )
+
+
+def _validated_user(user: User, friends_count: int) -> UserOut:
+    """``UserOut.from_user`` as it was, validating every field again."""
+    user_dict = user.model_dump(
+        exclude={"password_hash", "friended_by", "friends", "updated_at"}
+    )
+    user_dict["friends_count"] = friends_count
+    return UserOut(**user_dict)
+
+
+def encode_validated(rows: list[User]) -> bytes:
+    page = _page([_validated_user(user, i) for i, user in enumerate(rows)])
+    # Serialization runs in the event loop for coroutine routes
+    content = LOOP.run_until_complete(
+        serialize_response(field=PAGE_FIELD, response_content=page, is_coroutine=True)
+    )
+    return JSONResponse(content).body
+
+
+def encode_constructed(rows: list[User]) -> bytes:
+    page = _page([UserOut.from_user(user, i) for i, user in enumerate(rows)])
+    return ModelResponse(page).body
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> dict:
+    fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "min_ms": round(durations[0], 4),
+        "p50_ms": round(statistics.median(durations), 4),
+        "p95_ms": round(durations[int(len(durations) * 0.95) - 1], 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = _users(args.users)
+    body = encode_constructed(rows)
+    if json.loads(body) != json.loads(encode_validated(rows)):
+        raise SystemExit("Both paths should produce the same body")
+
+    results = {
+        "validated": _time(lambda: encode_validated(rows), args.repeat),
+        "constructed": _time(lambda: encode_constructed(rows), args.repeat),
+    }
+    print(
+        json.dumps(
+            {
+                "repeat": args.repeat,
+                "users": args.users,
+                "bytes": len(body),
+                **results,
+                "speedup": round(
+                    results["validated"]["min_ms"] / results["constructed"]["min_ms"],
+                    2,
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()